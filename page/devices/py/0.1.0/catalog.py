@@ -0,0 +1,187 @@
+"""
+Device-type catalog served as pre-serialized per-language payloads with strong ETags
+"""
+
+import hashlib
+import json
+
+LANGUAGES = ("pl", "en", "de")
+DEFAULT_LANGUAGE = "pl"  # same fallback as pageTitle in devices.js
+
+TITLES = {"pl": "Wybór Urządzenia", "en": "Device Selection", "de": "Geräteauswahl"}
+
+CATEGORIES = {
+    "respiratory": {"pl": "Ochrona dróg oddechowych", "en": "Respiratory Protection", "de": "Atemschutz"},
+    "chemical": {"pl": "Ochrona chemiczna", "en": "Chemical Protection", "de": "Chemikalienschutz"},
+}
+
+# availableDevices from devices.js; translatable fields are {language: text} maps
+DEVICE_TYPES = (
+    {
+        "id": "PP_MASK",
+        "name": {"pl": "Maska PP", "en": "PP Mask", "de": "PP-Maske"},
+        "description": {
+            "pl": "Maska z filtrem cząsteczkowym",
+            "en": "Particle Protection Mask",
+            "de": "Partikelschutzmaske",
+        },
+        "icon": "😷",
+        "category": "respiratory",
+        "color": "blue",
+        "specifications": {
+            "filterType": "P3",
+            "protection": {"pl": "Cząsteczki, aerozole", "en": "Particles, aerosols", "de": "Partikel, Aerosole"},
+            "standards": ["EN 149:2001+A1:2009", "CE"],
+            "weight": "85g",
+        },
+    },
+    {
+        "id": "NP_MASK",
+        "name": {"pl": "Maska NP", "en": "NP Mask", "de": "NP-Maske"},
+        "description": {
+            "pl": "Maska z filtrem przeciwgazowym",
+            "en": "Gas Protection Mask",
+            "de": "Gasschutzmaske",
+        },
+        "icon": "🎭",
+        "category": "respiratory",
+        "color": "green",
+        "specifications": {
+            "filterType": "A2P3",
+            "protection": {
+                "pl": "Gazy, pary, cząsteczki",
+                "en": "Gases, vapors, particles",
+                "de": "Gase, Dämpfe, Partikel",
+            },
+            "standards": ["EN 14387:2004", "CE"],
+            "weight": "320g",
+        },
+    },
+    {
+        "id": "SCBA",
+        "name": {"pl": "Aparat oddechowy SCBA", "en": "SCBA", "de": "Pressluftatmer (SCBA)"},
+        "description": {
+            "pl": "Samodzielny aparat oddechowy",
+            "en": "Self-Contained Breathing Apparatus",
+            "de": "Umluftunabhängiges Atemschutzgerät",
+        },
+        "icon": "🛡️",
+        "category": "respiratory",
+        "color": "purple",
+        "specifications": {
+            "filterType": "Independent",
+            "protection": {
+                "pl": "Pełna ochrona dróg oddechowych",
+                "en": "Complete respiratory protection",
+                "de": "Vollständiger Atemschutz",
+            },
+            "standards": ["EN 137:2006", "CE"],
+            "weight": "15.2kg",
+        },
+    },
+    {
+        "id": "CPS",
+        "name": {"pl": "Kombinezon CPS", "en": "CPS Protection Suit", "de": "CPS-Schutzanzug"},
+        "description": {
+            "pl": "Kombinezon ochrony chemicznej",
+            "en": "Chemical Protection Suit",
+            "de": "Chemikalienschutzanzug",
+        },
+        "icon": "🧪",
+        "category": "chemical",
+        "color": "orange",
+        "specifications": {
+            "filterType": "None",
+            "protection": {
+                "pl": "Ochrona przed substancjami chemicznymi",
+                "en": "Chemical substance protection",
+                "de": "Schutz vor chemischen Substanzen",
+            },
+            "standards": ["EN 14605:2005", "EN 464:1994"],
+            "weight": "1.8kg",
+        },
+    },
+)
+
+
+def apply_edits(devices, edits):
+    """Device types with stored edits applied: a type replaces or adds, None removes."""
+    merged = {device["id"]: device for device in devices}
+    for device_id, device in edits:
+        if device is None:
+            merged.pop(device_id, None)
+        else:
+            merged[device_id] = device
+    return tuple(merged.values())
+
+
+def localise(value, language):
+    """Resolve {language: text} maps (at any depth) to one language, falling back to English."""
+    if isinstance(value, dict):
+        if value and set(value) <= set(LANGUAGES):
+            return value.get(language) or value.get("en") or next(iter(value.values()))
+        return {key: localise(item, language) for key, item in value.items()}
+    if isinstance(value, list):
+        return [localise(item, language) for item in value]
+    return value
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class Catalog:
+    """Device types plus their serialized payload per language.
+
+    Payloads are rebuilt only when the catalog changes, so a request costs a dict lookup and an
+    ETag comparison. The ETag hashes the payload bytes, so it survives restarts unchanged.
+    """
+
+    def __init__(self, devices=DEVICE_TYPES):
+        self.devices = {device["id"]: device for device in devices}
+        self.version = 0
+        self.payloads = {}
+        self._rebuild()
+
+    def get(self, device_id):
+        return self.devices.get(device_id)
+
+    def put(self, device):
+        self.devices[device["id"]] = device
+        self._rebuild()
+
+    def remove(self, device_id):
+        if self.devices.pop(device_id, None) is None:
+            return False
+        self._rebuild()
+        return True
+
+    def payload(self, language):
+        """(body, etag) for ``language``; unknown languages get the default one."""
+        return self.payloads.get(language) or self.payloads[DEFAULT_LANGUAGE]
+
+    def _rebuild(self):
+        self.version += 1
+        self.payloads = {language: self._serialize(language) for language in LANGUAGES}
+
+    def _serialize(self, language):
+        devices = [localise(device, language) for device in self.devices.values()]
+        counts = {}
+        for device in devices:
+            counts[device["category"]] = counts.get(device["category"], 0) + 1
+        body = json.dumps({
+            "language": language,
+            "title": TITLES[language],
+            "devices": devices,
+            "categories": [
+                {"id": category, "name": localise(CATEGORIES.get(category, category), language), "count": count}
+                for category, count in counts.items()
+            ],
+        }, ensure_ascii=False, separators=(",", ":")).encode()
+        return body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
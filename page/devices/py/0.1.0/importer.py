@@ -0,0 +1,118 @@
+"""
+Streaming CSV import of device units with per-row validation and batched writes
+"""
+
+import codecs
+import csv
+import itertools
+import re
+
+from inventory import FIELDS
+from search import normalise
+
+BATCH_ROWS = 5000  # rows per transaction
+MAX_ERRORS = 1000  # per-row errors reported; the rest are only counted
+MAX_FIELD = 256
+SERIAL = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._/-]{0,63}$")
+DELIMITERS = (",", ";", "\t")  # spreadsheet exports with a Polish or German locale use ";"
+REQUIRED = ("serial", "device_type")
+INTERVALS = ("inspection_interval", "maintenance_interval")
+ALIASES = {  # header names in the page languages (pl, en, de)
+    "sn": "serial", "serial_number": "serial", "numer_seryjny": "serial", "seriennummer": "serial",
+    "type": "device_type", "typ": "device_type", "device": "device_type", "urzadzenie": "device_type",
+    "nazwa": "name", "opis": "description", "beschreibung": "description",
+    "lokalizacja": "location", "standort": "location",
+}
+
+
+def text_lines(chunks, encoding="utf-8-sig"):
+    """Decode byte chunks incrementally and yield lines, so an upload is never held whole."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def columns(header):
+    """Map CSV header names to unit fields; unknown columns are ignored."""
+    names = [ALIASES.get(name, name) for name in ("_".join(normalise(h).split()) for h in header)]
+    missing = [field for field in REQUIRED if field not in names]
+    if missing:
+        raise ValueError(f"CSV header is missing required column(s): {', '.join(missing)}")
+    return {field: names.index(field) for field in FIELDS if field in names}
+
+
+def validate(row, mapping, width, known_types):
+    """(unit, None) for a valid row or (None, error message)."""
+    if len(row) != width:
+        return None, f"expected {width} columns, got {len(row)}"
+    unit = {field: row[i].strip() or None for field, i in mapping.items()}
+    serial = unit["serial"]
+    if not serial or not SERIAL.match(serial):
+        return None, f"invalid serial {serial!r}"
+    if unit["device_type"] not in known_types:
+        return None, f"unknown device type {unit['device_type']!r}"
+    too_long = [field for field, value in unit.items() if value and len(value) > MAX_FIELD]
+    if too_long:
+        return None, f"{too_long[0]} longer than {MAX_FIELD} characters"
+    for field in INTERVALS:
+        value = unit.get(field)
+        if value is not None:
+            if not value.isdigit() or int(value) < 1:
+                return None, f"{field} must be a whole number of days, got {value!r}"
+            unit[field] = int(value)
+    return unit, None
+
+
+def import_csv(lines, known_types, write, batch_rows=BATCH_ROWS, max_errors=MAX_ERRORS):
+    """Validate CSV ``lines`` row by row and pass valid units to ``write(units, fields)`` in batches.
+
+    Memory is bounded by one batch plus the set of serials seen (to reject in-file duplicates),
+    whatever the file size. Invalid rows are skipped and reported with their CSV line number;
+    valid rows are imported even when others fail.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        raise ValueError("CSV file is empty")
+    reader = csv.reader(itertools.chain([first], lines), delimiter=max(DELIMITERS, key=first.count))
+    header = next(reader)
+    mapping = columns(header)
+    width = len(header)
+    seen = set()
+    batch = []
+    result = {"rows": 0, "imported": 0, "error_count": 0, "errors": []}
+
+    def fail(line, serial, message):
+        result["error_count"] += 1
+        if len(result["errors"]) < max_errors:
+            result["errors"].append({"line": line, "serial": serial, "error": message})
+
+    try:
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            result["rows"] += 1
+            unit, error = validate(row, mapping, width, known_types)
+            if error:
+                fail(reader.line_num, row[mapping["serial"]].strip() if len(row) > mapping["serial"] else None, error)
+                continue
+            if unit["serial"] in seen:
+                fail(reader.line_num, unit["serial"], "duplicate serial in file")
+                continue
+            seen.add(unit["serial"])
+            batch.append(unit)
+            if len(batch) >= batch_rows:
+                result["imported"] += write(batch, tuple(mapping))
+                batch = []
+    except (csv.Error, UnicodeDecodeError) as e:
+        fail(reader.line_num, None, f"unreadable CSV, import stopped: {e}")
+    if batch:
+        result["imported"] += write(batch, tuple(mapping))
+    return result
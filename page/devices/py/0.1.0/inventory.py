@@ -0,0 +1,212 @@
+"""
+Persistent inventory of serial-numbered device units
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    serial TEXT PRIMARY KEY,
+    device_type TEXT NOT NULL,
+    model TEXT,
+    name TEXT,
+    description TEXT,
+    location TEXT,
+    status TEXT NOT NULL DEFAULT 'active',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_devices_type ON devices (device_type, serial);
+CREATE TABLE IF NOT EXISTS device_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    serial TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    at TEXT NOT NULL,
+    result TEXT,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_device_events_serial ON device_events (serial, at);
+CREATE TABLE IF NOT EXISTS stands (
+    stand_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    interval REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS device_types (
+    id TEXT PRIMARY KEY,
+    body TEXT  -- catalog entry as JSON; NULL removes a built-in type
+);
+"""
+
+FIELDS = (
+    "serial", "device_type", "model", "name", "description", "location", "status",
+    "inspection_interval", "maintenance_interval",
+)
+
+# columns added after the first release of the table, applied to existing databases on open
+MIGRATIONS = (
+    ("inspection_interval", "INTEGER"),
+    ("maintenance_interval", "INTEGER"),
+    ("last_inspection", "TEXT"),
+    ("last_maintenance", "TEXT"),
+)
+
+
+def utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class DeviceStore:
+    """SQLite-backed device units keyed by serial; writes are batched into single transactions."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(devices)")}
+        with self.db:
+            for column, kind in MIGRATIONS:
+                if column not in existing:
+                    self.db.execute(f"ALTER TABLE devices ADD COLUMN {column} {kind}")
+
+    def upsert_many(self, devices, fields=FIELDS):
+        """Insert or update units in one transaction.
+
+        Only ``fields`` are written: existing units keep ``created_at`` and every other column, so an
+        import without e.g. a location column does not clear stored locations.
+        """
+        now = utc_now()
+        names = [field for field in FIELDS if field in fields or field in ("serial", "device_type")]
+        rows = [
+            tuple(device.get(field) or "active" if field == "status" else device.get(field) for field in names) + (now, now)
+            for device in devices
+        ]
+        columns = ", ".join(names + ["created_at", "updated_at"])
+        updates = ", ".join(f"{field} = excluded.{field}" for field in names[1:] + ["updated_at"])
+        with self.lock, self.db:
+            self.db.executemany(
+                f"INSERT INTO devices ({columns}) VALUES ({', '.join('?' * (len(names) + 2))}) "
+                f"ON CONFLICT(serial) DO UPDATE SET {updates}",
+                rows,
+            )
+        return len(rows)
+
+    def upsert(self, device):
+        self.upsert_many([device])
+        return self.get(device["serial"])
+
+    def get(self, serial):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM devices WHERE serial = ?", (serial,)).fetchone()
+        return dict(row) if row else None
+
+    def get_many(self, serials):
+        """Units for ``serials`` in the given order; unknown serials are skipped."""
+        if not serials:
+            return []
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT * FROM devices WHERE serial IN ({', '.join('?' * len(serials))})", list(serials)
+            ).fetchall()
+        found = {row["serial"]: dict(row) for row in rows}
+        return [found[serial] for serial in serials if serial in found]
+
+    def delete(self, serial):
+        with self.lock, self.db:
+            return self.db.execute("DELETE FROM devices WHERE serial = ?", (serial,)).rowcount > 0
+
+    def record_event(self, serial, kind, at, result=None, note=None, done=None):
+        """Log an event for a unit; ``done`` names the last_* column it completes, if any.
+
+        Backdated events are logged but never move last_* backwards. Returns the updated unit, or
+        None for an unknown serial.
+        """
+        with self.lock, self.db:
+            if self.db.execute("SELECT 1 FROM devices WHERE serial = ?", (serial,)).fetchone() is None:
+                return None
+            self.db.execute(
+                "INSERT INTO device_events (serial, kind, at, result, note) VALUES (?, ?, ?, ?, ?)",
+                (serial, kind, at, result, note),
+            )
+            if done:
+                self.db.execute(
+                    f"UPDATE devices SET {done} = MAX(COALESCE({done}, ''), ?), updated_at = ? WHERE serial = ?",
+                    (at, utc_now(), serial),
+                )
+            row = self.db.execute("SELECT * FROM devices WHERE serial = ?", (serial,)).fetchone()
+        return dict(row)
+
+    def events(self, serial, limit=100):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT kind, at, result, note FROM device_events WHERE serial = ? ORDER BY at DESC, id DESC LIMIT ?",
+                (serial, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iterate(self, batch=5000):
+        """Yield every unit in serial order without holding the whole table in memory."""
+        last = ""
+        while True:
+            with self.lock:
+                rows = self.db.execute(
+                    "SELECT * FROM devices WHERE serial > ? ORDER BY serial LIMIT ?", (last, batch)
+                ).fetchall()
+            if not rows:
+                return
+            yield from (dict(row) for row in rows)
+            last = rows[-1]["serial"]
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    def put_stand(self, stand_id, url, interval):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO stands (stand_id, url, interval) VALUES (?, ?, ?) "
+                "ON CONFLICT(stand_id) DO UPDATE SET url = excluded.url, interval = excluded.interval",
+                (stand_id, url, interval),
+            )
+
+    def delete_stand(self, stand_id):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM stands WHERE stand_id = ?", (stand_id,))
+
+    def stands(self):
+        """Registered stands as (stand_id, url, interval)."""
+        with self.lock:
+            return [tuple(row) for row in self.db.execute("SELECT stand_id, url, interval FROM stands")]
+
+    def put_type(self, device):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO device_types (id, body) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET body = excluded.body",
+                (device["id"], json.dumps(device, ensure_ascii=False)),
+            )
+
+    def delete_type(self, device_id):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO device_types (id, body) VALUES (?, NULL) ON CONFLICT(id) DO UPDATE SET body = NULL",
+                (device_id,),
+            )
+
+    def type_edits(self):
+        """Stored catalog edits as (id, device type or None when removed)."""
+        with self.lock:
+            rows = self.db.execute("SELECT id, body FROM device_types").fetchall()
+        return [(row["id"], None if row["body"] is None else json.loads(row["body"])) for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
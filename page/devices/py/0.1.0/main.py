@@ -2,10 +2,41 @@
 FastAPI backend for devices page
 """
 
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from catalog import CATEGORIES, DEVICE_TYPES, LANGUAGES, Catalog, apply_edits, etag_matches
+from importer import import_csv, text_lines
+from inventory import DeviceStore
+from maintenance import EVENTS, KINDS, MaintenanceIndex, due_dates
+from poller import POLL_INTERVAL, StatusPoller
+from search import SearchIndex
+
 
-app = FastAPI(title="MaskService Devices API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app):
+    for device in catalog.devices.values():
+        index_type(device)
+    for unit in devices.iterate():
+        index_unit(unit)
+    for stand_id, url, interval in devices.stands():
+        poller.add(stand_id, url, interval)
+    polling = asyncio.create_task(poller.run())
+    yield
+    polling.cancel()
+
+
+app = FastAPI(title="MaskService Devices API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,8 +44,86 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+DATA_DIR = os.environ.get("DEVICES_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+os.makedirs(DATA_DIR, exist_ok=True)
+
+devices = DeviceStore(os.path.join(DATA_DIR, "devices.db"))
+catalog = Catalog(apply_edits(DEVICE_TYPES, devices.type_edits()))
+index = SearchIndex()
+schedule = MaintenanceIndex()
+poller = StatusPoller()
+
+MAX_SEARCH_RESULTS = 100
+UPLOAD_CHUNK = 1 << 16
+KEEPALIVE = 15.0  # seconds between SSE comments on an idle status stream
+
+
+class DeviceType(BaseModel):
+    name: Dict[str, str]
+    description: Dict[str, str] = {}
+    icon: str = ""
+    category: str
+    color: str = ""
+    specifications: Dict[str, Any] = {}
+
+
+class DeviceUnit(BaseModel):
+    device_type: str
+    model: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    status: str = "active"
+    inspection_interval: Optional[int] = Field(None, ge=1)
+    maintenance_interval: Optional[int] = Field(None, ge=1)
+
+
+class DeviceEvent(BaseModel):
+    kind: str
+    at: Optional[datetime] = None
+    result: Optional[str] = None
+    note: Optional[str] = None
+
+
+class StandTarget(BaseModel):
+    url: str = Field(pattern=r"^http://")
+    interval: float = Field(POLL_INTERVAL, ge=0.1)
+
+
+def translations(value):
+    return list(value.values()) if isinstance(value, dict) else [value]
+
+
+def index_type(device):
+    """Make a device type findable by its id, every translation, category and standards."""
+    specifications = device.get("specifications") or {}
+    index.set_type(
+        device["id"],
+        device["id"],
+        *translations(device.get("name", "")),
+        *translations(device.get("description", "")),
+        *translations(specifications.get("protection", "")),
+        *[CATEGORIES.get(device.get("category"), {}).get(language) for language in LANGUAGES],
+        *specifications.get("standards", []),
+    )
+
+
+def index_unit(unit):
+    index.add(unit["serial"], unit["device_type"], unit["model"], unit["name"], unit["description"], unit["location"])
+    schedule.update(unit)
+
+
+def write_units(units, fields):
+    """Store one import batch, then index the stored rows (which keep columns the file lacked)."""
+    devices.upsert_many(units, fields)
+    for unit in devices.get_many([unit["serial"] for unit in units]):
+        index_unit(unit)
+    return len(units)
+
+
 @app.get("/")
 async def root():
     return {"message": "MaskService Devices API v0.1.0", "status": "active"}
@@ -23,6 +132,167 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "devices", "version": "0.1.0"}
 
+@app.get("/api/devices/catalog")
+async def device_catalog(lang: str = "pl", if_none_match: Optional[str] = Header(None)):
+    """Localised availableDevices payload; revalidate with If-None-Match for a body-less 304."""
+    body, etag = catalog.payload(lang)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.put("/api/devices/catalog/{device_id}")
+async def put_device_type(device_id: str, device: DeviceType):
+    device = {"id": device_id, **device.model_dump()}
+    await run_in_threadpool(devices.put_type, device)
+    catalog.put(device)
+    index_type(catalog.get(device_id))
+    return {"id": device_id, "version": catalog.version}
+
+@app.delete("/api/devices/catalog/{device_id}")
+async def delete_device_type(device_id: str):
+    if catalog.get(device_id) is None:
+        raise HTTPException(status_code=404, detail=f"Device type {device_id} not found")
+    await run_in_threadpool(devices.delete_type, device_id)
+    catalog.remove(device_id)
+    index.drop_type(device_id)
+    return {"id": device_id, "deleted": True, "version": catalog.version}
+
+@app.get("/api/devices/status")
+async def device_status():
+    return {**poller.snapshot(), "summary": poller.stats()}
+
+@app.get("/api/devices/status/stream")
+async def stream_device_status(since: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """Server-sent events: a snapshot, then one delta per wake-up with the stands changed since.
+
+    Clients reconnecting with Last-Event-ID (or ``since``) get only what they missed, or a fresh
+    snapshot when that is no longer retained.
+    """
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def events():
+        version = since
+        while True:
+            changed = poller.changed
+            changes = poller.since(version) if version is not None else None
+            if changes is None:
+                yield f"event: snapshot\nid: {poller.version}\ndata: {json.dumps(poller.snapshot())}\n\n"
+            elif changes:
+                delta = {"version": poller.version, "stands": list(changes.values())}
+                yield f"event: delta\nid: {poller.version}\ndata: {json.dumps(delta)}\n\n"
+            version = poller.version
+            try:
+                await asyncio.wait_for(changed.wait(), KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.put("/api/devices/status/{stand_id}")
+async def put_stand(stand_id: str, target: StandTarget):
+    """Register a stand controller URL (e.g. http://stand-01:8300/status/stand-01) to poll."""
+    await run_in_threadpool(devices.put_stand, stand_id, target.url, target.interval)
+    return poller.add(stand_id, target.url, target.interval).view()
+
+@app.get("/api/devices/status/{stand_id}")
+async def get_stand(stand_id: str):
+    stand = poller.stands.get(stand_id)
+    if stand is None:
+        raise HTTPException(status_code=404, detail=f"Stand {stand_id} not registered")
+    return stand.view()
+
+@app.delete("/api/devices/status/{stand_id}")
+async def delete_stand(stand_id: str):
+    if stand_id not in poller.stands:
+        raise HTTPException(status_code=404, detail=f"Stand {stand_id} not registered")
+    await run_in_threadpool(devices.delete_stand, stand_id)
+    poller.remove(stand_id)
+    return {"stand": stand_id, "deleted": True}
+
+@app.post("/api/devices/import")
+def import_devices(file: UploadFile = File(...), dry_run: bool = False):
+    """Import units from a CSV upload with at least serial and device_type columns."""
+    chunks = iter(lambda: file.file.read(UPLOAD_CHUNK), b"")
+    write = (lambda units, fields: len(units)) if dry_run else write_units
+    try:
+        result = import_csv(text_lines(chunks), set(catalog.devices), write)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"filename": file.filename, "dry_run": dry_run, **result}
+
+@app.get("/api/devices/maintenance/due")
+def maintenance_due(days: int = Query(30, ge=0, le=3650), kind: Optional[str] = None,
+                    limit: int = Query(100, ge=1, le=1000)):
+    """Units whose inspection or maintenance falls due within ``days`` (overdue first), soonest first."""
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=422, detail=f"Unknown kind {kind}. Must be: {', '.join(KINDS)}")
+    today = datetime.now(timezone.utc).date()
+    until = today + timedelta(days=days)
+    entries = schedule.due(until, KINDS if kind is None else (kind,), limit + 1)
+    units = {unit["serial"]: unit for unit in devices.get_many(list({serial for _, serial, _ in entries[:limit]}))}
+    items = [
+        {
+            "serial": serial,
+            "kind": kind,
+            "due": due.isoformat(),
+            "days_left": (due - today).days,
+            "overdue": due < today,
+            **{field: units.get(serial, {}).get(field) for field in ("device_type", "model", "location")},
+        }
+        for due, serial, kind in entries[:limit]
+    ]
+    return {"until": until.isoformat(), "count": len(items), "truncated": len(entries) > limit, "items": items}
+
+@app.get("/api/devices/search")
+def search_devices(q: str = "", limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS), offset: int = Query(0, ge=0)):
+    """Search-as-you-type over serial, model, name, description, location and device-type text."""
+    result = index.search(q, limit=limit, offset=offset)
+    return {"query": q, "total": result["total"], "estimated": result["estimated"],
+            "devices": devices.get_many(result["serials"])}
+
+@app.put("/api/devices/{serial}")
+def put_device(serial: str, unit: DeviceUnit):
+    if catalog.get(unit.device_type) is None:
+        raise HTTPException(status_code=422, detail=f"Unknown device type {unit.device_type}")
+    device = devices.upsert({"serial": serial, **unit.model_dump()})
+    index_unit(device)
+    return {**device, "due": due_dates(device)}
+
+@app.get("/api/devices/{serial}")
+def get_device(serial: str):
+    device = devices.get(serial)
+    if device is None:
+        raise HTTPException(status_code=404, detail=f"Device {serial} not found")
+    return {**device, "due": due_dates(device)}
+
+@app.delete("/api/devices/{serial}")
+def delete_device(serial: str):
+    if not devices.delete(serial):
+        raise HTTPException(status_code=404, detail=f"Device {serial} not found")
+    index.remove(serial)
+    schedule.remove(serial)
+    return {"serial": serial, "deleted": True}
+
+@app.post("/api/devices/{serial}/events")
+def add_device_event(serial: str, event: DeviceEvent):
+    """Record a test, inspection, maintenance or repair; completing ones move the unit's next due date."""
+    if event.kind not in EVENTS:
+        raise HTTPException(status_code=422, detail=f"Unknown event kind {event.kind}. Must be: {', '.join(EVENTS)}")
+    at = event.at or datetime.now(timezone.utc)
+    at = (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    done = EVENTS[event.kind] if event.kind != "test" or (event.result or "").upper() == "PASS" else None
+    device = devices.record_event(serial, event.kind, at, event.result, event.note, done)
+    if device is None:
+        raise HTTPException(status_code=404, detail=f"Device {serial} not found")
+    schedule.update(device)
+    return {**device, "due": due_dates(device)}
+
+@app.get("/api/devices/{serial}/events")
+def device_events(serial: str, limit: int = Query(100, ge=1, le=1000)):
+    return {"serial": serial, "events": devices.events(serial, limit)}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8207)
@@ -0,0 +1,108 @@
+"""
+Maintenance-due index: inspection and maintenance deadlines of every unit in one heap
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import date, timedelta
+
+KINDS = ("inspection", "maintenance")
+
+# days between inspections / maintenance per device type, used when a unit sets no interval of its own
+DEFAULT_INTERVALS = {
+    "PP_MASK": {"inspection": 180, "maintenance": 365},
+    "NP_MASK": {"inspection": 180, "maintenance": 365},
+    "SCBA": {"inspection": 30, "maintenance": 365},
+    "CPS": {"inspection": 180, "maintenance": 365},
+}
+FALLBACK_INTERVALS = {"inspection": 180, "maintenance": 365}
+
+# event kinds accepted from the tests and service pages and the last_* column each one completes
+EVENTS = {
+    "test": "last_inspection",  # only a passed test counts as an inspection
+    "inspection": "last_inspection",
+    "maintenance": "last_maintenance",
+    "repair": None,
+    "note": None,
+}
+
+
+def interval(unit, kind):
+    return unit.get(f"{kind}_interval") or DEFAULT_INTERVALS.get(unit["device_type"], FALLBACK_INTERVALS)[kind]
+
+
+def due_date(unit, kind):
+    """Last completion (or registration, if never done) plus the interval."""
+    since = unit.get(f"last_{kind}") or unit["created_at"]
+    return date.fromisoformat(since[:10]) + timedelta(days=interval(unit, kind))
+
+
+def due_dates(unit):
+    return {kind: due_date(unit, kind).isoformat() for kind in KINDS}
+
+
+class MaintenanceIndex:
+    """Min-heap of (due date, kind) per unit with lazy invalidation.
+
+    An event or edit pushes the unit's new deadline and marks the old entry stale, so updates are
+    O(log n) and the heap is only rebuilt when stale entries outnumber live ones. ``due`` walks the
+    heap best-first from the root and stops at the first deadline past the horizon, so finding the k
+    entries due soonest costs O(k log k) however many units are tracked. Retired units are not tracked.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heap = []
+        self.current = {}  # (serial, kind) -> live heap entry
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.current)
+
+    def update(self, unit):
+        with self.lock:
+            deadlines = dict(self._deadlines(unit))
+            for kind in KINDS:
+                key = (unit["serial"], kind)
+                old = self.current.get(key)
+                due = deadlines.get(kind)
+                if old is not None and old[0] == due:
+                    continue
+                if due is None:
+                    self.current.pop(key, None)
+                else:
+                    self.current[key] = entry = (due, next(self.seq), unit["serial"], kind)
+                    heapq.heappush(self.heap, entry)
+            self._compact()
+
+    def remove(self, serial):
+        with self.lock:
+            for kind in KINDS:
+                self.current.pop((serial, kind), None)
+            self._compact()
+
+    def due(self, until, kinds=KINDS, limit=None):
+        """Live entries (due, serial, kind) with due <= ``until``, soonest first (overdue included)."""
+        found = []
+        with self.lock:
+            heap = self.heap
+            frontier = [(heap[0], 0)] if heap and heap[0][0] <= until else []
+            while frontier and (limit is None or len(found) < limit):
+                entry, i = heapq.heappop(frontier)
+                if self.current.get((entry[2], entry[3])) is entry and entry[3] in kinds:
+                    found.append((entry[0], entry[2], entry[3]))
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap) and heap[child][0] <= until:
+                        heapq.heappush(frontier, (heap[child], child))
+        return found
+
+    def _deadlines(self, unit):
+        if unit.get("status") == "retired":
+            return []
+        return [(kind, due_date(unit, kind)) for kind in KINDS]
+
+    def _compact(self):
+        if len(self.heap) > 2 * len(self.current) + 64:
+            self.heap = list(self.current.values())
+            heapq.heapify(self.heap)
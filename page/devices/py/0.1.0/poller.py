@@ -0,0 +1,358 @@
+"""
+Asyncio status poller for test stands: pooled keep-alive HTTP, per-stand timeouts and backoff, delta publishing
+"""
+
+import asyncio
+import heapq
+import json
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit
+
+STATUSES = ("ONLINE", "OFFLINE", "ERROR", "MAINTENANCE")  # deviceStatus values of the header module
+POLL_INTERVAL = 2.0
+TIMEOUT = 1.0
+MAX_BACKOFF = 60.0
+OFFLINE_AFTER = 3  # consecutive failures before a stand is reported OFFLINE
+POOL_SIZE = 16  # keep-alive connections per controller host:port
+MAX_IN_FLIGHT = 512
+HISTORY = 10000  # deltas kept for clients catching up by version
+MAX_BODY = 1 << 20  # largest status response accepted from a stand controller
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; a request either completes or the connection is dropped.
+
+    Responses are framed by Content-Length, chunked encoding (extensions and trailers skipped) or,
+    failing both, by the server closing the connection. Interim 1xx responses are skipped. A
+    connection is reused only when the response was fully framed and the server keeps it open.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nConnection: keep-alive\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        while True:
+            version, status = await self._status_line()
+            headers = await self._headers()
+            if not 100 <= status < 200:
+                break
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (version != "HTTP/1.0" or connection == "keep-alive")
+        if status in (204, 304):
+            body = b""
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            body = await self._chunked()
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if not 0 <= length <= MAX_BODY:
+                raise ValueError(f"response body of {length} bytes")
+            body = await self.reader.readexactly(length)
+        else:
+            body = b""  # delimited by the server closing the connection
+            while chunk := await self.reader.read(65536):
+                body += chunk
+                if len(body) > MAX_BODY:
+                    raise ValueError(f"response body over {MAX_BODY} bytes")
+            keep_alive = False
+        if not keep_alive:
+            self.close()
+        return status, body
+
+    async def _status_line(self):
+        line = await self.reader.readuntil(b"\r\n")
+        if not line.startswith(b"HTTP/"):
+            raise ValueError(f"not an HTTP response: {line[:40]!r}")
+        parts = line.split()
+        return parts[0].decode("latin-1"), int(parts[1])
+
+    async def _headers(self):
+        headers = {}
+        while (line := await self.reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return headers
+
+    async def _chunked(self):
+        body = b""
+        while size := int((await self.reader.readuntil(b"\r\n")).split(b";")[0].strip(), 16):
+            if len(body) + size > MAX_BODY:
+                raise ValueError(f"response body over {MAX_BODY} bytes")
+            body += (await self.reader.readexactly(size + 2))[:-2]
+        while await self.reader.readuntil(b"\r\n") != b"\r\n":
+            pass  # trailer fields
+        return body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class ConnectionPool:
+    """Idle keep-alive connections per host:port, at most ``size`` in use per host at a time.
+
+    Stands behind one controller share its connections, so polling 1,000 stands costs a handful of
+    sockets rather than one per stand, and no TCP handshake once the pool is warm.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.idle = {}
+        self.slots = {}
+        self.opened = 0
+
+    async def get(self, host, port, path, timeout):
+        """(status, body); the timeout covers the request only, not the wait for a free connection."""
+        key = (host, port)
+        slots = self.slots.get(key)
+        if slots is None:
+            slots = self.slots[key] = asyncio.Semaphore(self.size)
+            self.idle[key] = []
+        async with slots:
+            idle = self.idle[key]
+            conn = idle.pop() if idle else None
+            if conn is None:
+                conn = Connection(host, port)
+                self.opened += 1
+            try:
+                result = await asyncio.wait_for(conn.get(path), timeout)
+            except BaseException:
+                conn.close()  # a half-read response leaves the stream unusable
+                raise
+            if conn.writer is not None:
+                idle.append(conn)
+            return result
+
+    def close(self):
+        for idle in self.idle.values():
+            for conn in idle:
+                conn.close()
+            idle.clear()
+
+
+@dataclass
+class Stand:
+    stand_id: str
+    url: str
+    interval: float = POLL_INTERVAL
+    status: str = "OFFLINE"
+    quality: str = "unknown"
+    latency: Optional[float] = None
+    last_connection: Optional[str] = None
+    channels: dict = field(default_factory=dict)
+    failures: int = 0
+    error: Optional[str] = None
+    polls: int = 0
+    due: float = 0.0
+
+    @property
+    def target(self):
+        parts = urlsplit(self.url)
+        path = parts.path or "/"
+        return parts.hostname or "localhost", parts.port or 80, path + (f"?{parts.query}" if parts.query else "")
+
+    def view(self):
+        return {
+            "stand": self.stand_id,
+            "status": self.status,
+            "connectionQuality": self.quality,
+            "latency": self.latency,
+            "lastConnection": self.last_connection,
+            "channels": self.channels,
+            "error": self.error,
+        }
+
+    def key(self):
+        """Fields whose change is pushed to clients; latency alone changes on every poll."""
+        return self.status, self.quality, self.error, json.dumps(self.channels, sort_keys=True)
+
+
+def stand_status(payload):
+    """deviceStatus of a reachable stand: its own status if reported, else derived from its channels."""
+    status = payload.get("status") if isinstance(payload, dict) else None
+    if status in STATUSES:
+        return status
+    channels = payload.get("channels") if isinstance(payload, dict) else None
+    states = {c.get("status") for c in channels.values() if isinstance(c, dict)} if isinstance(channels, dict) else set()
+    if "ERROR" in states:
+        return "ERROR"
+    if states == {"MAINTENANCE"}:
+        return "MAINTENANCE"
+    return "ONLINE"
+
+
+def quality(latency, timeout):
+    """connectionQuality of a successful poll from its round trip relative to the timeout."""
+    if latency < 0.25 * timeout:
+        return "good"
+    return "fair"
+
+
+class StatusPoller:
+    """Polls every registered stand on its own interval from a single asyncio task.
+
+    Due times live in a heap, so the scheduler wakes only when the next stand is due; each poll is
+    a short task holding one pooled connection. A failed poll backs off exponentially with jitter
+    (capped at ``max_backoff``) so dead stands cost almost nothing, and a stand goes OFFLINE after
+    ``offline_after`` consecutive failures rather than on a single lost response. Only changed
+    stands are published, as numbered deltas that clients can resume from by version.
+    """
+
+    def __init__(self, timeout=TIMEOUT, max_backoff=MAX_BACKOFF, offline_after=OFFLINE_AFTER,
+                 pool=None, max_in_flight=MAX_IN_FLIGHT, history=HISTORY):
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.offline_after = offline_after
+        self.pool = pool or ConnectionPool()
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.stands = {}
+        self.heap = []
+        self.wake = asyncio.Event()
+        self.version = 0
+        self.deltas = deque(maxlen=history)
+        self.changed = asyncio.Event()
+        self.tasks = set()
+        self.rng = random.Random()
+
+    def add(self, stand_id, url, interval=POLL_INTERVAL):
+        """Register or re-target a stand; it is polled immediately."""
+        stand = self.stands.get(stand_id)
+        if stand is None:
+            stand = self.stands[stand_id] = Stand(stand_id, url, interval)
+            self._publish(stand_id, stand.view())
+        else:
+            stand.url, stand.interval, stand.failures = url, interval, 0
+        self._schedule(stand, time.monotonic())
+        return stand
+
+    def remove(self, stand_id):
+        if self.stands.pop(stand_id, None) is None:
+            return False
+        self._publish(stand_id, {"stand": stand_id, "removed": True})
+        return True
+
+    def snapshot(self):
+        return {"version": self.version, "stands": [stand.view() for stand in self.stands.values()]}
+
+    def since(self, version):
+        """Latest state of every stand changed after ``version``; None once that far back is forgotten,
+        or for a version this process never reached (one from before a restart)."""
+        if version == self.version:
+            return {}
+        if version > self.version or not self.deltas or version < self.deltas[0][0] - 1:
+            return None
+        changes = {}
+        for number, stand_id, view in reversed(self.deltas):
+            if number <= version:
+                break
+            changes.setdefault(stand_id, view)
+        return changes
+
+    def stats(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        for stand in self.stands.values():
+            counts[stand.status] += 1
+        return {
+            "stands": len(self.stands),
+            "statuses": counts,
+            "in_flight": len(self.tasks),
+            "connections_opened": self.pool.opened,
+            "version": self.version,
+        }
+
+    async def run(self):
+        try:
+            while True:
+                now = time.monotonic()
+                while self.heap and self.heap[0][0] <= now:
+                    due, stand_id = heapq.heappop(self.heap)
+                    stand = self.stands.get(stand_id)
+                    if stand is None or stand.due != due:
+                        continue  # removed or rescheduled since
+                    stand.due = float("inf")
+                    task = asyncio.create_task(self._poll(stand))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+                self.wake.clear()
+                delay = self.heap[0][0] - now if self.heap else None
+                try:
+                    await asyncio.wait_for(self.wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self.tasks):
+                task.cancel()
+            self.pool.close()
+
+    async def _poll(self, stand):
+        host, port, path = stand.target
+        started = time.monotonic()
+        try:
+            async with self.in_flight:
+                status, body = await self.pool.get(host, port, path, self.timeout)
+            if status >= 500:
+                raise ValueError(f"HTTP {status}")
+            if status >= 400:
+                self._reached(stand, started, "ERROR", {}, f"HTTP {status}")
+            else:
+                payload = json.loads(body or b"{}")
+                channels = payload.get("channels", {}) if isinstance(payload, dict) else {}
+                self._reached(stand, started, stand_status(payload), channels, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # malformed payloads, oversized headers...: back off, never drop the stand
+            self._failed(stand, str(e) or type(e).__name__)
+
+    def _reached(self, stand, started, status, channels, error):
+        if self.stands.get(stand.stand_id) is not stand:
+            return
+        before = stand.key()
+        stand.polls += 1
+        stand.failures = 0
+        stand.latency = round((time.monotonic() - started) * 1000, 1)
+        stand.status, stand.channels, stand.error = status, channels, error
+        stand.quality = quality(stand.latency / 1000, self.timeout)
+        stand.last_connection = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        if stand.key() != before:
+            self._publish(stand.stand_id, stand.view())
+        self._schedule(stand, time.monotonic() + stand.interval)
+
+    def _failed(self, stand, error):
+        if self.stands.get(stand.stand_id) is not stand:
+            return
+        before = stand.key()
+        stand.polls += 1
+        stand.failures += 1
+        stand.error = error
+        stand.quality = "poor"
+        if stand.failures >= self.offline_after:
+            stand.status, stand.quality, stand.channels = "OFFLINE", "unknown", {}
+        if stand.key() != before:
+            self._publish(stand.stand_id, stand.view())
+        backoff = min(self.max_backoff, stand.interval * 2 ** stand.failures)
+        self._schedule(stand, time.monotonic() + self.rng.uniform(0.5, 1.0) * backoff)
+
+    def _schedule(self, stand, due):
+        stand.due = due
+        heapq.heappush(self.heap, (due, stand.stand_id))
+        if self.heap[0][1] == stand.stand_id:
+            self.wake.set()
+
+    def _publish(self, stand_id, view):
+        self.version += 1
+        self.deltas.append((self.version, stand_id, view))
+        self.changed.set()
+        self.changed = asyncio.Event()
@@ -0,0 +1,219 @@
+"""
+In-memory search-as-you-type index over device units: trigrams for substrings, token prefixes for short input
+"""
+
+import itertools
+import threading
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+_FOLD = str.maketrans({"ł": "l", "Ł": "L", "ß": "ss"})
+EMPTY = frozenset()
+RECHECK_LIMIT = 4096  # trigram hits re-checked for the exact substring up front; more are checked per page
+
+
+@lru_cache(maxsize=65536)  # field values repeat heavily across a fleet
+def normalise(text):
+    """Casefold and strip diacritics so "Urządzenie", "urzadzenie" and "URZADZENIE" match."""
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text.translate(_FOLD))
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def index_keys(text):
+    """Trigrams of the whole text plus "^" + the 1- and 2-character prefix of every token."""
+    keys = {text[i:i + 3] for i in range(len(text) - 2)}
+    for token in text.split():
+        keys.add("^" + token[:1])
+        keys.add("^" + token[:2])
+    return keys
+
+
+def lookup(grams, texts, term, limit=None):
+    """(ids, exact): ids whose text contains ``term`` (3+ characters) or has a token starting with it.
+
+    Trigram hits of longer terms can still miss the exact substring and are re-checked, unless
+    there are more than ``limit``; then they are returned unchecked with ``exact`` False.
+    """
+    if len(term) < 3:
+        return grams.get("^" + term, EMPTY), True
+    postings = sorted((grams.get(term[i:i + 3], EMPTY) for i in range(len(term) - 2)), key=len)
+    ids = postings[0].intersection(*postings[1:]) if postings[0] else EMPTY
+    if len(term) > 3:
+        if limit is not None and len(ids) > limit:
+            return ids, False
+        ids = {i for i in ids if term in texts[i]}
+    return ids, True
+
+
+class SearchIndex:
+    """Inverted index of device units by serial and by the distinct values of their other fields.
+
+    Serials are unique and get their own trigram postings. Model, name, description and location
+    values repeat across a fleet, so each distinct value is indexed once and maps to its units;
+    type-level text (localised names, category, standards) is matched once per device type. Adding,
+    replacing or removing a unit touches only its own postings. Every query term must match: terms of
+    3+ characters as substrings, shorter ones as token prefixes. When a term has more serial trigram
+    hits than ``RECHECK_LIMIT``, only the hits on the returned page are re-checked for the substring,
+    and the total is the trigram count unless every hit got checked.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = {}
+        self.serials = []
+        self.serial_texts = []
+        self.doc_values = []
+        self.doc_types = []
+        self.free = []
+        self.serial_grams = defaultdict(set)
+        self.values = {}
+        self.value_texts = []
+        self.value_docs = []
+        self.value_grams = defaultdict(set)
+        self.free_values = []
+        self.by_type = defaultdict(set)
+        self.type_texts = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def set_type(self, device_type, *texts):
+        with self.lock:
+            self.type_texts[device_type] = normalise(" ".join(str(t) for t in texts if t))
+
+    def drop_type(self, device_type):
+        with self.lock:
+            self.type_texts.pop(device_type, None)
+
+    def add(self, serial, device_type, *fields):
+        """Index a unit, replacing its previous entry if the serial is already indexed."""
+        with self.lock:
+            self._add(serial, device_type, fields)
+
+    def remove(self, serial):
+        with self.lock:
+            return self._remove(serial)
+
+    def _add(self, serial, device_type, fields):
+        self._remove(serial)
+        text = normalise(serial)
+        values = tuple({self._value(normalise(f)) for f in fields if f})
+        if self.free:
+            doc = self.free.pop()
+            self.serials[doc], self.serial_texts[doc] = serial, text
+            self.doc_values[doc], self.doc_types[doc] = values, device_type
+        else:
+            doc = len(self.serials)
+            self.serials.append(serial)
+            self.serial_texts.append(text)
+            self.doc_values.append(values)
+            self.doc_types.append(device_type)
+        self.ids[serial] = doc
+        for key in index_keys(text):
+            self.serial_grams[key].add(doc)
+        for value in values:
+            self.value_docs[value].add(doc)
+        self.by_type[device_type].add(doc)
+
+    def _remove(self, serial):
+        doc = self.ids.pop(serial, None)
+        if doc is None:
+            return False
+        for key in index_keys(self.serial_texts[doc]):
+            postings = self.serial_grams[key]
+            postings.discard(doc)
+            if not postings:
+                del self.serial_grams[key]
+        for value in self.doc_values[doc]:
+            self.value_docs[value].discard(doc)
+            if not self.value_docs[value]:
+                self._drop_value(value)
+        self.by_type[self.doc_types[doc]].discard(doc)
+        self.serials[doc] = self.serial_texts[doc] = self.doc_values[doc] = self.doc_types[doc] = None
+        self.free.append(doc)
+        return True
+
+    def _value(self, text):
+        value = self.values.get(text)
+        if value is not None:
+            return value
+        if self.free_values:
+            value = self.free_values.pop()
+            self.value_texts[value], self.value_docs[value] = text, set()
+        else:
+            value = len(self.value_texts)
+            self.value_texts.append(text)
+            self.value_docs.append(set())
+        self.values[text] = value
+        for key in index_keys(text):
+            self.value_grams[key].add(value)
+        return value
+
+    def _drop_value(self, value):
+        text = self.value_texts[value]
+        del self.values[text]
+        for key in index_keys(text):
+            postings = self.value_grams[key]
+            postings.discard(value)
+            if not postings:
+                del self.value_grams[key]
+        self.value_texts[value] = self.value_docs[value] = None
+        self.free_values.append(value)
+
+    def _term(self, term):
+        """(docs, exact) of one query term; ``exact`` is False when serial hits were left unchecked."""
+        serials, exact = lookup(self.serial_grams, self.serial_texts, term, RECHECK_LIMIT)
+        parts = [serials]
+        parts.extend(self.value_docs[v] for v in lookup(self.value_grams, self.value_texts, term)[0])
+        for device_type, text in self.type_texts.items():
+            if term in text if len(term) >= 3 else any(token.startswith(term) for token in text.split()):
+                parts.append(self.by_type[device_type])
+        parts = sorted((part for part in parts if part), key=len, reverse=True)
+        if not parts:
+            return EMPTY, True
+        if len(parts) == 1 or len(parts[0]) == len(self.ids):
+            return parts[0], exact
+        return parts[0].union(*parts[1:]), exact
+
+    def _contains(self, doc, terms):
+        """Whether every term is a substring of one of the unit's texts."""
+        values, type_text = self.doc_values[doc], self.type_texts.get(self.doc_types[doc], "")
+        return all(
+            term in self.serial_texts[doc] or term in type_text or any(term in self.value_texts[v] for v in values)
+            for term in terms
+        )
+
+    def search(self, query, limit=20, offset=0):
+        """Serials matching every term of ``query``; an exact serial comes first, then index order."""
+        terms = normalise(query).split()
+        if not terms:
+            return {"total": 0, "estimated": False, "serials": []}
+        with self.lock:
+            return self._search(query, terms, limit, offset)
+
+    def _search(self, query, terms, limit, offset):
+        found = {term: self._term(term) for term in set(terms)}
+        unchecked = [term for term, (_, exact) in found.items() if not exact]
+        matches = sorted((docs for docs, _ in found.values()), key=len)
+        candidates = matches[0].intersection(*matches[1:]) if len(matches) > 1 else matches[0]
+        exact = self.ids.get(query.strip())
+        first = [exact] if exact in candidates and self._contains(exact, unchecked) else []
+        wanted = offset + limit
+        if 4 * len(candidates) > len(self.serials):
+            # dense result: walking doc ids in order reaches ``wanted`` hits long before the end
+            docs = (doc for doc in range(len(self.serials)) if doc in candidates and doc != exact)
+        else:
+            docs = iter(sorted(doc for doc in candidates if doc != exact))
+        if unchecked:
+            docs = (doc for doc in docs if self._contains(doc, unchecked))
+        rest = list(itertools.islice(docs, wanted + 1))
+        ordered = (first + rest)[offset:wanted]
+        if unchecked and len(rest) > wanted:
+            total, estimated = len(candidates), True  # trigram hits; only the page was re-checked
+        else:
+            total, estimated = (len(first) + len(rest) if unchecked else len(candidates)), False
+        return {"total": total, "estimated": estimated, "serials": [self.serials[doc] for doc in ordered]}
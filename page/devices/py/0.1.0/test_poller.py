@@ -0,0 +1,163 @@
+"""
+Response framing of the stand poller's HTTP connection against a raw asyncio server
+"""
+
+import asyncio
+
+import pytest
+
+from poller import MAX_BODY, Connection, ConnectionPool, StatusPoller
+
+
+def serve(responses, check):
+    """Run ``check(port, server)`` against a server answering each request with the next raw response.
+
+    A response ending in ``None`` makes the server close the connection after writing it.
+    """
+
+    async def main():
+        pending = list(responses)
+        stats = {"connections": 0}
+
+        async def handle(reader, writer):
+            stats["connections"] += 1
+            try:
+                while pending:
+                    await reader.readuntil(b"\r\n\r\n")
+                    response = pending.pop(0)
+                    close = isinstance(response, tuple)
+                    writer.write(response[0] if close else response)
+                    await writer.drain()
+                    if close:
+                        break
+            except asyncio.IncompleteReadError:
+                pass
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await check(port, stats)
+
+    return asyncio.run(main())
+
+
+def test_content_length_keeps_connection():
+    async def check(port, stats):
+        conn = Connection("127.0.0.1", port)
+        first = await conn.get("/status")
+        second = await conn.get("/status")
+        conn.close()
+        return first, second, stats["connections"]
+
+    ok = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}"
+    assert serve([ok, ok], check) == ((200, b"{}"), (200, b"{}"), 1)
+
+
+def test_body_without_length_is_read_until_close():
+    async def check(port, stats):
+        conn = Connection("127.0.0.1", port)
+        first = await conn.get("/status")
+        reusable = conn.writer is not None
+        second = await conn.get("/status")
+        conn.close()
+        return first, reusable, second, stats["connections"]
+
+    unframed = (b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{"status": "ONLINE"}', None)
+    ok = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}"
+    assert serve([unframed, ok], check) == ((200, b'{"status": "ONLINE"}'), False, (200, b"{}"), 2)
+
+
+def test_chunk_extensions_and_trailers():
+    async def check(port, stats):
+        conn = Connection("127.0.0.1", port)
+        first = await conn.get("/status")
+        second = await conn.get("/status")
+        conn.close()
+        return first, second, stats["connections"]
+
+    chunked = (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+        b"5;name=value\r\nhello\r\n6\r\n world\r\n0;last\r\nX-Checksum: 1234\r\nX-Other: 5\r\n\r\n"
+    )
+    ok = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}"
+    assert serve([chunked, ok], check) == ((200, b"hello world"), (200, b"{}"), 1)
+
+
+def test_interim_responses_are_skipped():
+    async def check(port, stats):
+        conn = Connection("127.0.0.1", port)
+        result = await conn.get("/status")
+        conn.close()
+        return result
+
+    response = (
+        b"HTTP/1.1 100 Continue\r\n\r\n"
+        b"HTTP/1.1 103 Early Hints\r\nLink: </style.css>\r\n\r\n"
+        b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+    )
+    assert serve([response], check) == (200, b"ok")
+
+
+def test_no_content_and_http10():
+    async def check(port, stats):
+        conn = Connection("127.0.0.1", port)
+        empty = await conn.get("/status")
+        kept = conn.writer is not None
+        old = await conn.get("/status")
+        return empty, kept, old, conn.writer is None
+
+    no_content = b"HTTP/1.1 204 No Content\r\n\r\n"
+    http10 = b"HTTP/1.0 200 OK\r\nContent-Length: 2\r\n\r\n{}"
+    assert serve([no_content, http10], check) == ((204, b""), True, (200, b"{}"), True)
+
+
+def test_oversized_body_is_refused():
+    async def check(port, stats):
+        conn = Connection("127.0.0.1", port)
+        with pytest.raises(ValueError):
+            await conn.get("/status")
+        conn.close()
+
+    serve([b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY + 1)], check)
+
+
+def test_pool_drops_connection_after_garbage():
+    async def check(port, stats):
+        pool = ConnectionPool(size=1)
+        with pytest.raises(ValueError):
+            await pool.get("127.0.0.1", port, "/status", 1.0)
+        result = await pool.get("127.0.0.1", port, "/status", 1.0)
+        pool.close()
+        return result, stats["connections"]
+
+    garbage = b"SSH-2.0-OpenSSH\r\n"
+    ok = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}"
+    assert serve([garbage, ok], check) == ((200, b"{}"), 2)
+
+
+def test_since_after_restart_needs_snapshot():
+    poller = StatusPoller()
+    poller._publish("s1", {"stand": "s1"})
+    poller._publish("s2", {"stand": "s2"})
+    assert poller.since(2) == {}
+    assert poller.since(1) == {"s2": {"stand": "s2"}}
+    assert poller.since(500) is None  # Last-Event-ID from before a backend restart
+
+
+def test_unexpected_payload_backs_off():
+    async def check(port, stats):
+        poller = StatusPoller(timeout=1.0)
+        stand = poller.add("s1", f"http://127.0.0.1:{port}/status", interval=1.0)
+        runner = asyncio.create_task(poller.run())
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if stand.polls:
+                break
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        return stand.failures, stand.due != float("inf"), [stand_id for _, stand_id in poller.heap]
+
+    body = b'{"channels": {"1": {"status": ["x"]}}}'
+    response = b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+    assert serve([response], check) == (1, True, ["s1"])
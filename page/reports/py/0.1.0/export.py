@@ -0,0 +1,81 @@
+"""
+Streaming report export: summary and breakdown first, then every matching result read page by page
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from itertools import islice
+
+FORMATS = {
+    "json": ("application/json", "json"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+CSV_HEADER = ["ID", "Date", "Device Type", "Serial", "Operator", "Result", "Duration", "Score"]
+CHUNK_ROWS = 500
+
+
+def chunks(rows, size=CHUNK_ROWS):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def test_row(row):
+    """One result in the recentTests shape of the report, plus serial and duration."""
+    return {
+        "id": row["id"],
+        "date": row["started_at"],
+        "device": row["device_type"],
+        "serial": row["device_serial"],
+        "operator": row["operator"],
+        "result": row["result"],
+        "duration": row["duration"],
+        "score": row["score"],
+    }
+
+
+def json_stream(report, rows):
+    """The exportData object of reports.js with the individual tests appended as they are read."""
+    head = {
+        "exportTime": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "format": "json",
+        "filters": report["filters"],
+        "summary": report["summary"],
+        "deviceBreakdown": report["deviceBreakdown"],
+    }
+    yield json.dumps(head, separators=(",", ":"))[:-1] + ',"tests":['
+    separator = ""
+    for chunk in chunks(rows):
+        yield separator + ",".join(json.dumps(test_row(row), separators=(",", ":")) for row in chunk)
+        separator = ","
+    yield "]}"
+
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for chunk in chunks(rows):
+        for row in chunk:
+            writer.writerow([
+                row["id"], row["started_at"], row["device_type"], row["device_serial"] or "", row["operator"],
+                row["result"], "" if row["duration"] is None else row["duration"],
+                "" if row["score"] is None else row["score"],
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def stream(fmt, report, rows):
+    if fmt == "json":
+        return json_stream(report, rows)
+    if fmt == "csv":
+        return csv_stream(rows)
+    raise ValueError(f"Unsupported export format: {fmt}")
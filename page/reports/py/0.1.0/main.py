@@ -2,10 +2,30 @@
 FastAPI backend for reports page
 """
 
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
+from export import FORMATS, stream
+from pdf import PdfRenderer, QueueFull
+from rollups import Filters, ReportCache, ResultStore
+
 
-app = FastAPI(title="MaskService Reports API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app):
+    renderer.start()
+    yield
+    renderer.shutdown()
+
+
+app = FastAPI(title="MaskService Reports API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +35,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+DATA_DIR = os.environ.get("REPORTS_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+os.makedirs(DATA_DIR, exist_ok=True)
+
+results = ResultStore(os.path.join(DATA_DIR, "results.db"))
+reports = ReportCache()
+renderer = PdfRenderer()
+
+MAX_RESULTS_BATCH = 10000
+
+
+def report_filters(
+    date_from: str = Query(..., alias="dateFrom"),
+    date_to: str = Query(..., alias="dateTo"),
+    device_type: str = Query("all", alias="deviceType"),
+    test_status: str = Query("all", alias="testStatus"),
+    operator: str = "all",
+):
+    """The reportsViewComponent ``filters`` object from query parameters of the same names."""
+    try:
+        return Filters.parse(date_from, date_to, device_type, test_status, operator)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def cached_report(filters):
+    report, generation = reports.get(filters)
+    if report is None:
+        report = results.report(filters)
+        reports.put(filters, report, generation)
+    return report
+
+
 @app.get("/")
 async def root():
     return {"message": "MaskService Reports API v0.1.0", "status": "active"}
@@ -23,6 +75,68 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "reports", "version": "0.1.0"}
 
+@app.post("/api/reports/results")
+def record_results(runs: List[Dict[str, Any]]):
+    """Record new or corrected runs (tests history shape: id, device.deviceType, createdBy, result, date, revision, ...).
+
+    Re-sending a run is a no-op, so a sender may retry a batch after a timeout.
+    """
+    if len(runs) > MAX_RESULTS_BATCH:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_RESULTS_BATCH} results per request")
+    try:
+        recorded, days = results.record_many(runs)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid result: {e}")
+    if days:
+        reports.invalidate(days)
+    return {"recorded": recorded, "days": days}
+
+@app.get("/api/reports")
+def generate_report(filters: Filters = Depends(report_filters)):
+    """summary, deviceBreakdown and recentTests for the reportsViewComponent filters."""
+    return cached_report(filters)
+
+@app.get("/api/reports/export")
+def export_report(format: str = "csv", filters: Filters = Depends(report_filters)):
+    """Stream every result matching the filters; memory and time to first byte do not grow with the range."""
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(FORMATS)}")
+    report = cached_report(filters)
+    media_type, extension = FORMATS[format]
+    filename = f"report-{filters.date_from}-{filters.date_to}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{extension}"
+    return StreamingResponse(
+        stream(format, report, results.iterate(filters)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/api/reports/pdf")
+async def export_pdf(filters: Filters = Depends(report_filters)):
+    """The report as a PDF, rendered in a worker process so the event loop stays free."""
+    report = await run_in_threadpool(cached_report, filters)
+    try:
+        data = await renderer.render(report)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="PDF rendering timed out")
+    filename = f"report-{filters.date_from}-{filters.date_to}.pdf"
+    return Response(data, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/api/reports/pdf/stats")
+async def pdf_stats():
+    return renderer.stats()
+
+@app.get("/api/reports/cache")
+async def report_cache_stats():
+    return reports.stats()
+
+@app.post("/api/reports/rollups/rebuild")
+def rebuild_rollups():
+    days = results.rebuild()
+    reports.clear()
+    return {"days": days}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8208)
@@ -0,0 +1,210 @@
+"""
+PDF rendering of reports, in worker processes kept off the event loop
+"""
+
+import asyncio
+import multiprocessing
+import os
+import unicodedata
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+MAX_PENDING = 64  # jobs rendering or waiting for a worker; more are refused
+TIMEOUT = 30.0
+NICE = 10  # workers yield the CPU to the API process on a busy kiosk
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+LINE = 16
+_FOLD = str.maketrans({"ł": "l", "Ł": "L", "ß": "ss", "–": "-", "—": "-"})
+
+
+class QueueFull(Exception):
+    """Raised when MAX_PENDING jobs are already queued."""
+
+
+def latin(text):
+    """Text in WinAnsiEncoding, the encoding of the standard PDF fonts; letters outside it lose their accents."""
+    text = str(text)
+    try:
+        return text.encode("cp1252")
+    except UnicodeEncodeError:
+        return "".join(c if c.encode("cp1252", "ignore") else fold(c) for c in text).encode("cp1252", "replace")
+
+
+def fold(char):
+    decomposed = unicodedata.normalize("NFKD", char.translate(_FOLD))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def pdf_string(text):
+    return b"(" + latin(text).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class Document:
+    """Pages of positioned text and rules in Helvetica, serialised as a minimal PDF 1.4 file."""
+
+    def __init__(self):
+        self.pages = []
+        self.page = None
+        self.y = 0
+
+    def new_page(self):
+        self.page = []
+        self.pages.append(self.page)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def space(self, height):
+        """Start a new page unless ``height`` points still fit above the bottom margin."""
+        if self.page is None or self.y - height < MARGIN + LINE:
+            self.new_page()
+
+    def text(self, x, text, size=10, bold=False):
+        font = b"/F2" if bold else b"/F1"
+        self.page.append(b"BT %s %d Tf %d %d Td %s Tj ET" % (font, size, x, self.y, pdf_string(text)))
+
+    def rule(self):
+        self.page.append(b"%d %d m %d %d l S" % (MARGIN, self.y - 4, PAGE_WIDTH - MARGIN, self.y - 4))
+
+    def row(self, columns, values, bold=False):
+        self.space(LINE)
+        for x, value in zip(columns, values):
+            self.text(x, value, bold=bold)
+        self.y -= LINE
+
+    def render(self):
+        count = len(self.pages)
+        # objects: 1 catalog, 2 page tree, 3-4 fonts, then a page and its content stream per page
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % (5 + 2 * i) for i in range(count)), count),
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        for number, page in enumerate(self.pages, 1):
+            footer = b"BT /F1 8 Tf %d %d Td %s Tj ET" % (PAGE_WIDTH - MARGIN - 50, MARGIN // 2, pdf_string(f"Page {number} / {count}"))
+            content = zlib.compress(b"\n".join([*page, footer]))
+            objects.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> "
+                b"/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, 6 + 2 * (number - 1))
+            )
+            objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(content), content))
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+        out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (len(objects) + 1, xref)
+        return bytes(out)
+
+
+def render(report):
+    """PDF of a report as returned by ResultStore.report: filters, summary, device breakdown, recent tests."""
+    doc = Document()
+    doc.new_page()
+    filters, summary = report["filters"], report["summary"]
+    doc.text(MARGIN, "Test Report", size=18, bold=True)
+    doc.y -= 2 * LINE
+    doc.text(MARGIN, f"Period: {filters['dateFrom']} - {filters['dateTo']}")
+    doc.y -= LINE
+    doc.text(MARGIN, f"Device type: {filters['deviceType']}   Status: {filters['testStatus']}   Operator: {filters['operator']}")
+    doc.y -= LINE
+    doc.text(MARGIN, f"Generated: {datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC", size=8)
+    doc.y -= 2 * LINE
+
+    doc.text(MARGIN, "Summary", size=13, bold=True)
+    doc.y -= LINE + 4
+    for label, value in (("Total tests", summary["totalTests"]), ("Passed", summary["passedTests"]),
+                         ("Failed", summary["failedTests"]), ("Success rate", f"{summary['successRate']}%")):
+        doc.row((MARGIN, MARGIN + 150), (label, value))
+    doc.y -= LINE
+
+    columns = (MARGIN, MARGIN + 170, MARGIN + 250, MARGIN + 330, MARGIN + 410)
+    doc.space(3 * LINE)
+    doc.text(MARGIN, "Device breakdown", size=13, bold=True)
+    doc.y -= LINE + 4
+    doc.row(columns, ("Device Type", "Total Tests", "Passed", "Failed", "Success Rate"), bold=True)
+    doc.rule()
+    for device in report["deviceBreakdown"]:
+        rate = round(device["passed"] / device["count"] * 100) if device["count"] else 0
+        doc.row(columns, (device["type"], device["count"], device["passed"], device["failed"], f"{rate}%"))
+    doc.y -= LINE
+
+    columns = (MARGIN, MARGIN + 120, MARGIN + 230, MARGIN + 330, MARGIN + 420)
+    doc.space(3 * LINE)
+    doc.text(MARGIN, "Recent tests", size=13, bold=True)
+    doc.y -= LINE + 4
+    doc.row(columns, ("Date", "Device", "Operator", "Result", "Score"), bold=True)
+    doc.rule()
+    for test in report["recentTests"]:
+        score = "" if test["score"] is None else test["score"]
+        doc.row(columns, (test["date"].replace("T", " "), test["device"], test["operator"], test["result"], score))
+    return doc.render()
+
+
+def _lower_priority():
+    try:
+        os.nice(NICE)
+    except OSError:
+        pass
+
+
+class PdfRenderer:
+    """Process pool for ``render`` with a bounded number of pending jobs and a per-job timeout.
+
+    Rendering is CPU-bound, so it runs in worker processes at lower priority and the event loop only
+    awaits the result; a burst of requests queues for the workers instead of slowing the API, and
+    requests beyond ``max_pending`` are refused at once rather than queued without bound. A job that
+    times out is reported as such; its worker finishes the bounded render and is reused.
+    """
+
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING, timeout=TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.rendered = 0
+        self.timeouts = 0
+        self.refused = 0
+        self.pool = None
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")  # no forking of the threaded server process
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_lower_priority)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def render(self, report):
+        if self.pending >= self.max_pending:
+            self.refused += 1
+            raise QueueFull(f"{self.pending} PDF reports already pending")
+        self.pending += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.pool, render, report)
+            try:
+                data = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            self.rendered += 1
+            return data
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rendered": self.rendered,
+            "timeouts": self.timeouts,
+            "refused": self.refused,
+        }
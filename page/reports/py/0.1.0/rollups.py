@@ -0,0 +1,450 @@
+"""
+Test results and their daily and monthly rollups, from which reports are aggregated
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    device_type TEXT NOT NULL,
+    device_serial TEXT,
+    operator TEXT NOT NULL,
+    result TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    duration REAL,
+    score REAL,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_results_started ON results (started_at, id);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    day TEXT NOT NULL,
+    device_type TEXT NOT NULL,
+    operator TEXT NOT NULL,
+    result TEXT NOT NULL,
+    tests INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    PRIMARY KEY (day, device_type, operator, result)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    month TEXT NOT NULL,
+    device_type TEXT NOT NULL,
+    operator TEXT NOT NULL,
+    result TEXT NOT NULL,
+    tests INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    PRIMARY KEY (month, device_type, operator, result)
+) WITHOUT ROWID;
+"""
+
+# columns added after the first release of the results table, applied to existing databases on open
+MIGRATIONS = (
+    ("revision", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+MONTHLY_FROM_DAILY = (
+    "INSERT INTO monthly_rollups (month, device_type, operator, result, tests, duration) "
+    "SELECT substr(day, 1, 7), device_type, operator, result, SUM(tests), SUM(duration) "
+    "FROM daily_rollups GROUP BY 1, 2, 3, 4"
+)
+
+COLUMNS = ("id", "device_type", "device_serial", "operator", "result", "started_at", "duration", "score", "revision")
+
+# testStatus filter of reports.js -> stored result
+STATUSES = {"passed": "PASS", "failed": "FAIL"}
+RESULTS = ("PASS", "FAIL")
+UNKNOWN = "unknown"
+RECENT_TESTS = 20
+EXPORT_PAGE = 1000  # results read per query while exporting; the lock is released between pages
+MAX_RANGE_DAYS = 3660
+CACHE_SIZE = 256
+CACHE_TTL = 300.0  # seconds; bounds the age of a report whose invalidation was missed (e.g. a direct DB edit)
+
+
+class Filters(NamedTuple):
+    """The ``filters`` object of reports.js, normalised; "all" becomes None."""
+
+    date_from: date
+    date_to: date
+    device_type: Optional[str] = None
+    test_status: Optional[str] = None
+    operator: Optional[str] = None
+
+    @classmethod
+    def parse(cls, date_from, date_to, device_type="all", test_status="all", operator="all"):
+        try:
+            start, end = date.fromisoformat(str(date_from)[:10]), date.fromisoformat(str(date_to)[:10])
+        except ValueError as e:
+            raise ValueError(f"Invalid date: {e}") from e
+        if start > end:
+            raise ValueError("dateFrom must not be after dateTo")
+        if (end - start).days > MAX_RANGE_DAYS:
+            raise ValueError(f"Date range longer than {MAX_RANGE_DAYS} days")
+        status = None if test_status in (None, "", "all") else test_status
+        if status is not None and status not in STATUSES:
+            raise ValueError(f"testStatus must be all, {' or '.join(STATUSES)}")
+
+        def value(v):
+            return None if v in (None, "", "all") else v
+
+        return cls(start, end, value(device_type), status, value(operator))
+
+    def to_dict(self):
+        return {
+            "dateFrom": self.date_from.isoformat(),
+            "dateTo": self.date_to.isoformat(),
+            "deviceType": self.device_type or "all",
+            "testStatus": self.test_status or "all",
+            "operator": self.operator or "all",
+        }
+
+    def conditions(self):
+        """SQL conditions and parameters for the device type, operator and status filters."""
+        clauses, params = [], []
+        for column, value in (("device_type", self.device_type), ("operator", self.operator),
+                              ("result", STATUSES.get(self.test_status))):
+            if value is not None:
+                clauses.append(f" AND {column} = ?")
+                params.append(value)
+        return "".join(clauses), params
+
+    def where(self):
+        """Condition on raw results: started_at within the range (index-friendly) plus the filters."""
+        clauses, params = self.conditions()
+        end = (self.date_to + timedelta(days=1)).isoformat()
+        return f"started_at >= ? AND started_at < ?{clauses}", [self.date_from.isoformat(), end, *params]
+
+    def spans(self):
+        """Daily day ranges and the monthly month range that together cover the date range exactly.
+
+        Whole calendar months come from monthly rollups; only the partial months at either end are
+        summed from daily rollups, so a year costs about 12 monthly plus up to 60 daily buckets.
+        """
+        start, end = self.date_from, self.date_to
+        first = start if start.day == 1 else month_after(start)
+        last = end if month_after(end) - timedelta(days=1) == end else end.replace(day=1) - timedelta(days=1)
+        if first > last:
+            return [(start, end)], None
+        days = []
+        if start < first:
+            days.append((start, first - timedelta(days=1)))
+        if last < end:
+            days.append((last + timedelta(days=1), end))
+        return days, (first.isoformat()[:7], last.isoformat()[:7])
+
+
+def month_after(day):
+    """First day of the month following ``day``."""
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def utc_timestamp(value=None):
+    """Normalise a datetime/ISO string to a sortable UTC 'YYYY-MM-DDTHH:MM:SS' string."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00").replace(" ", "T"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def typed(value, kinds, name):
+    """``value`` if it is None or one of ``kinds``, else ValueError naming the field."""
+    if value is None or (isinstance(value, kinds) and not isinstance(value, bool)):
+        return value
+    raise ValueError(f"{name} must be {' or '.join(kind.__name__ for kind in kinds)}, got {type(value).__name__}")
+
+
+def result_row(run):
+    """Row for a finished run, accepted in the tests history shape ({device: {...}, createdBy, date, ...}).
+
+    Raises ValueError for a missing id or a field of the wrong type.
+    """
+    if typed(run.get("id"), (str, int), "id") in (None, ""):
+        raise ValueError("id is required")
+    device = typed(run.get("device"), (dict,), "device") or {}
+    text = {
+        name: typed(value, (str,), name)
+        for name, value in (
+            ("date", run.get("date") or run.get("started_at")),
+            ("device.deviceType", device.get("deviceType") or run.get("device_type")),
+            ("device.serial", device.get("serial") or run.get("device_serial")),
+            ("createdBy", run.get("createdBy") or run.get("operator")),
+            ("result", run.get("result")),
+        )
+    }
+    result = (text["result"] or "").upper()
+    return (
+        str(run["id"]),
+        text["device.deviceType"] or UNKNOWN,
+        text["device.serial"],
+        text["createdBy"] or UNKNOWN,
+        result if result in RESULTS else "OTHER",
+        utc_timestamp(text["date"]),
+        typed(run.get("duration"), (int, float), "duration"),
+        typed(run.get("score"), (int, float), "score"),
+        typed(run.get("revision"), (int,), "revision") or 0,
+    )
+
+
+def success_rate(passed, total):
+    return round(passed / total * 100, 1) if total else 0
+
+
+class ResultStore:
+    """SQLite-backed finished test results plus daily and monthly rollups keyed by device type,
+    operator and result.
+
+    Recording a result applies its difference to the stored one as +1/-1 deltas on the affected
+    buckets, so each result costs a constant amount of work and re-delivering it changes nothing;
+    a correction with a lower ``revision`` than the stored result is ignored. Reports read only the
+    rollups, except ``recentTests`` which reads raw results through the started_at index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(results)")}
+        with self.db:
+            for column, kind in MIGRATIONS:
+                if column not in existing:
+                    self.db.execute(f"ALTER TABLE results ADD COLUMN {column} {kind}")
+            if self.db.execute("SELECT NOT EXISTS (SELECT 1 FROM monthly_rollups)").fetchone()[0]:
+                self.db.execute(MONTHLY_FROM_DAILY)
+
+    def record_many(self, runs):
+        """Record new or corrected results in one transaction; returns (recorded, changed days)."""
+        latest = {}
+        for run in runs:
+            row = result_row(run)
+            if row[0] not in latest or row[-1] >= latest[row[0]][-1]:
+                latest[row[0]] = row
+        deltas = {}
+        changed = []
+        with self.lock, self.db:
+            stored = {}
+            ids = list(latest)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                for row in self.db.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM results WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ):
+                    stored[row[0]] = tuple(row)
+            for result_id, row in latest.items():
+                old = stored.get(result_id)
+                if old is not None:
+                    if old == row or row[-1] < old[-1]:
+                        continue  # already applied, or older than the stored correction
+                    add_delta(deltas, old, -1)
+                add_delta(deltas, row, 1)
+                changed.append(row)
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                changed,
+            )
+            self._apply(deltas)
+        return len(changed), sorted({key[0] for key in deltas})
+
+    def _apply(self, deltas):
+        """Add per-day deltas to the daily buckets and, summed per month, to the monthly buckets."""
+        monthly = {}
+        for (day, *rest), (tests, duration) in deltas.items():
+            bucket = monthly.setdefault((day[:7], *rest), [0, 0.0])
+            bucket[0] += tests
+            bucket[1] += duration
+        for table, column, changes in (("daily_rollups", "day", deltas), ("monthly_rollups", "month", monthly)):
+            rows = [(*key, tests, duration) for key, (tests, duration) in changes.items() if tests or duration]
+            self.db.executemany(
+                f"INSERT INTO {table} ({column}, device_type, operator, result, tests, duration) VALUES (?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT ({column}, device_type, operator, result) DO UPDATE SET "
+                f"tests = tests + excluded.tests, duration = duration + excluded.duration",
+                rows,
+            )
+            self.db.executemany(
+                f"DELETE FROM {table} WHERE {column} = ? AND device_type = ? AND operator = ? AND result = ? AND tests <= 0",
+                [key for key, (tests, _) in changes.items() if tests < 0],
+            )
+
+    def rebuild(self):
+        """Recompute every rollup from the raw results (repair only; recording keeps them current)."""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM daily_rollups")
+            self.db.execute("DELETE FROM monthly_rollups")
+            self.db.execute(
+                "INSERT INTO daily_rollups (day, device_type, operator, result, tests, duration) "
+                "SELECT substr(started_at, 1, 10), device_type, operator, result, COUNT(*), "
+                "COALESCE(SUM(duration), 0) FROM results GROUP BY 1, 2, 3, 4"
+            )
+            self.db.execute(MONTHLY_FROM_DAILY)
+            return self.db.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0]
+
+    def report(self, filters, recent=RECENT_TESTS):
+        """summary, deviceBreakdown and recentTests as reportsViewComponent renders them."""
+        clauses, params = filters.conditions()
+        days, months = filters.spans()
+        parts, part_params = [], []
+        for start, end in days:
+            parts.append(f"SELECT device_type, result, tests FROM daily_rollups WHERE day BETWEEN ? AND ?{clauses}")
+            part_params += [start.isoformat(), end.isoformat(), *params]
+        if months:
+            parts.append(f"SELECT device_type, result, tests FROM monthly_rollups WHERE month BETWEEN ? AND ?{clauses}")
+            part_params += [*months, *params]
+        where, where_params = filters.where()
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT device_type, result, SUM(tests) AS tests, COUNT(*) AS rollups "
+                f"FROM ({' UNION ALL '.join(parts)}) GROUP BY device_type, result",
+                part_params,
+            ).fetchall()
+            since = self._recent_since(filters, clauses, params, recent)
+            recent_rows = [] if since is None else self.db.execute(
+                f"SELECT id, started_at, device_type, operator, result, score FROM results "
+                f"WHERE {where} AND started_at >= ? ORDER BY started_at DESC, id DESC LIMIT ?",
+                [*where_params, since, recent],
+            ).fetchall()
+        breakdown = {}
+        for row in rows:
+            device = breakdown.setdefault(row["device_type"], {"type": row["device_type"], "count": 0, "passed": 0, "failed": 0})
+            device["count"] += row["tests"]
+            if row["result"] == "PASS":
+                device["passed"] += row["tests"]
+            elif row["result"] == "FAIL":
+                device["failed"] += row["tests"]
+        total = sum(d["count"] for d in breakdown.values())
+        passed = sum(d["passed"] for d in breakdown.values())
+        return {
+            "filters": filters.to_dict(),
+            "summary": {
+                "totalTests": total,
+                "passedTests": passed,
+                "failedTests": sum(d["failed"] for d in breakdown.values()),
+                "successRate": success_rate(passed, total),
+            },
+            "deviceBreakdown": sorted(breakdown.values(), key=lambda d: d["type"]),
+            "recentTests": [
+                {
+                    "id": row["id"],
+                    "date": row["started_at"],
+                    "device": row["device_type"],
+                    "operator": row["operator"],
+                    "result": row["result"],
+                    "score": row["score"],
+                }
+                for row in recent_rows
+            ],
+            "rollupRows": sum(row["rollups"] for row in rows),
+        }
+
+    def _recent_since(self, filters, clauses, params, recent):
+        """Earliest day among the latest days holding ``recent`` matching results, from the daily rollups.
+
+        Bounds the recentTests scan to those days: a filter matching few results would otherwise walk
+        the started_at index through the whole range.
+        """
+        found, since = 0, None
+        for day, tests in self.db.execute(
+            f"SELECT day, SUM(tests) FROM daily_rollups WHERE day BETWEEN ? AND ?{clauses} GROUP BY day ORDER BY day DESC",
+            [filters.date_from.isoformat(), filters.date_to.isoformat(), *params],
+        ):
+            found, since = found + tests, day
+            if found >= recent:
+                break
+        return since
+
+    def iterate(self, filters, batch=EXPORT_PAGE):
+        """Yield every result matching ``filters`` oldest first, one keyset page on the started_at index
+        at a time, so an export holds one page in memory and never blocks writers for long."""
+        where, params = filters.where()
+        last_id = ""
+        while True:
+            # params[0] is the lower started_at bound: moving it to the last row keeps each page a
+            # short range scan of the index instead of a rescan from dateFrom
+            with self.lock:
+                rows = self.db.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM results WHERE {where} AND (started_at > ? OR id > ?) "
+                    f"ORDER BY started_at, id LIMIT ?",
+                    [*params, params[0], last_id, batch],
+                ).fetchall()
+            yield from rows
+            if len(rows) < batch:
+                return
+            params[0], last_id = rows[-1]["started_at"], rows[-1]["id"]
+
+def add_delta(deltas, row, sign):
+    """Accumulate one result row's contribution to its (day, device_type, operator, result) bucket."""
+    bucket = deltas.setdefault((row[5][:10], row[1], row[3], row[4]), [0, 0.0])
+    bucket[0] += sign
+    bucket[1] += sign * (row[6] or 0.0)
+
+
+class ReportCache:
+    """LRU of generated reports keyed by their normalised Filters, with a time-to-live.
+
+    Recording results invalidates only the reports whose date range covers one of the changed days,
+    so the usual "last 30 days" report stays cached while older results are corrected. A report
+    computed while a write was in progress is not stored: ``generation`` changes on every
+    invalidation and ``put`` drops a report computed under an older one.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.reports = OrderedDict()  # Filters -> (expires, report)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filters):
+        """(report or None, generation to pass to ``put``)."""
+        with self.lock:
+            entry = self.reports.get(filters)
+            if entry is not None and entry[0] > time.monotonic():
+                self.reports.move_to_end(filters)
+                self.hits += 1
+                return entry[1], self.generation
+            if entry is not None:
+                del self.reports[filters]
+            self.misses += 1
+            return None, self.generation
+
+    def put(self, filters, report, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.reports[filters] = (time.monotonic() + self.ttl, report)
+            self.reports.move_to_end(filters)
+            if len(self.reports) > self.maxsize:
+                self.reports.popitem(last=False)
+
+    def invalidate(self, days):
+        """Drop the reports covering any of the ISO ``days``; returns how many were dropped."""
+        days = [date.fromisoformat(day) for day in days]
+        with self.lock:
+            self.generation += 1
+            stale = [f for f in self.reports if any(f.date_from <= day <= f.date_to for day in days)]
+            for filters in stale:
+                del self.reports[filters]
+            return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.reports.clear()
+
+    def stats(self):
+        return {"size": len(self.reports), "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,58 @@
+"""
+Recording results through the reports API: malformed batches are refused whole
+"""
+
+import os
+import tempfile
+
+os.environ["REPORTS_DATA_DIR"] = tempfile.mkdtemp()
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+client = TestClient(main.app)  # no lifespan: the PDF worker pool is not needed here
+QUERY = {"dateFrom": "2025-01-01", "dateTo": "2025-12-31"}
+
+
+def run(run_id, **fields):
+    return {"id": run_id, "device": {"deviceType": "SCBA"}, "createdBy": "jan", "result": "PASS",
+            "date": "2025-03-04T10:00:00Z", **fields}
+
+
+def rollups():
+    with main.results.lock:
+        return [
+            main.results.db.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4").fetchall()
+            for table in ("daily_rollups", "monthly_rollups")
+        ]
+
+
+@pytest.mark.parametrize("bad", [
+    run("r-bad", date=20240101),
+    {key: value for key, value in run("r-bad").items() if key != "id"},
+    run("r-bad", device="SCBA"),
+    run("r-bad", duration="12 s"),
+])
+def test_malformed_result_is_refused_without_partial_change(bad):
+    assert client.post("/api/reports/results", json=[run("r-seed")]).status_code == 200
+    before = rollups()
+    report = client.get("/api/reports", params=QUERY).json()
+
+    response = client.post("/api/reports/results", json=[run("r-good"), bad])
+
+    assert response.status_code == 422
+    assert rollups() == before
+    assert main.results.db.execute("SELECT COUNT(*) FROM results WHERE id = 'r-good'").fetchone()[0] == 0
+    assert client.get("/api/reports", params=QUERY).json() == report
+
+
+def test_valid_batch_is_recorded():
+    before = client.get("/api/reports", params=QUERY).json()["summary"]["totalTests"]
+
+    response = client.post("/api/reports/results", json=[run("r-1"), run("r-2", result="FAIL")])
+
+    assert response.status_code == 200
+    assert response.json() == {"recorded": 2, "days": ["2025-03-04"]}
+    assert client.get("/api/reports", params=QUERY).json()["summary"]["totalTests"] == before + 2
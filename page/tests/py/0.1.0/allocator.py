@@ -0,0 +1,202 @@
+"""
+Fair test queue and stand channel allocator
+"""
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+MAX_PRIORITY = 9
+
+
+@dataclass
+class QueueEntry:
+    test_id: str
+    plan: Any
+    operator: Optional[str]
+    priority: int
+    name: Optional[str]
+    tag: float
+    seq: int
+    enqueued: float = field(default_factory=time.time)
+    state: str = "queued"
+    stand: Optional[str] = None
+    channel: Optional[int] = None
+    started: Optional[float] = None
+
+    @property
+    def duration(self):
+        return self.plan.criteria.duration
+
+    def to_dict(self):
+        return {
+            "test_id": self.test_id,
+            "name": self.name or self.test_id,
+            "plan_id": self.plan.plan_id,
+            "operator": self.operator,
+            "priority": self.priority,
+            "state": self.state,
+            "enqueued": self.enqueued,
+            "stand": self.stand,
+            "channel": self.channel,
+            "started": self.started,
+        }
+
+
+class ChannelAllocator:
+    """Assigns queued runs to free stand channels by priority, then per-operator fair share.
+
+    Within a priority, runs are ordered by start-time fair queueing: each operator has a virtual
+    clock advanced by the planned duration of every run they queue, so an operator who queues
+    a hundred runs at once is interleaved with others instead of holding every channel. Queued
+    runs and free channels are heaps, so enqueue, dispatch and release are O(log n); removed
+    runs are dropped lazily when they reach the top of the queue.
+    """
+
+    def __init__(self):
+        self.channels = {}  # (stand, channel) -> test_id or None when free
+        self.free = []
+        self.retired = set()
+        self.queue = []
+        self.entries = {}
+        self.vtime = 0.0
+        self.finish = {}
+        self.seq = itertools.count()
+        self.removed = 0
+
+    def set_channels(self, stand, count):
+        """Register a stand with ``count`` channels; busy channels beyond ``count`` retire on release."""
+        for channel in range(count):
+            key = (stand, channel)
+            self.retired.discard(key)
+            if key not in self.channels:
+                self.channels[key] = None
+                heapq.heappush(self.free, key)
+        extra = {key for key in self.channels if key[0] == stand and key[1] >= count}
+        if extra:
+            for key in extra:
+                if self.channels[key] is None:
+                    del self.channels[key]
+                else:
+                    self.retired.add(key)
+            self.free = [key for key in self.free if key not in extra]
+            heapq.heapify(self.free)
+
+    def stands(self):
+        stands = {}
+        for (stand, channel), test_id in sorted(self.channels.items()):
+            stands.setdefault(stand, []).append({"channel": channel, "test_id": test_id})
+        return stands
+
+    def enqueue(self, test_id, plan, operator=None, priority=0, name=None):
+        if test_id in self.entries:
+            raise ValueError(f"Test {test_id} is already {self.entries[test_id].state}")
+        if not 0 <= priority <= MAX_PRIORITY:
+            raise ValueError(f"priority must be between 0 and {MAX_PRIORITY}")
+        tag = max(self.vtime, self.finish.get(operator, 0.0))
+        self.finish[operator] = tag + plan.criteria.duration
+        entry = self.entries[test_id] = QueueEntry(test_id, plan, operator, priority, name, tag, next(self.seq))
+        heapq.heappush(self.queue, (-priority, tag, entry.seq, test_id))
+        return entry
+
+    def remove(self, test_id):
+        """Drop a queued run; running ones are cancelled through their session instead."""
+        entry = self.entries.get(test_id)
+        if entry is None or entry.state != "queued":
+            return False
+        del self.entries[test_id]
+        self.removed += 1
+        if self.removed > len(self.queue) // 2:
+            self.queue = [item for item in self.queue if self._live(item)]
+            heapq.heapify(self.queue)
+            self.removed = 0
+        return True
+
+    def dispatch(self):
+        """Assign queued runs to free channels; returns the entries that should start now."""
+        assigned = []
+        while self.free and self.queue:
+            item = heapq.heappop(self.queue)
+            if not self._live(item):
+                self.removed = max(0, self.removed - 1)
+                continue
+            tag, test_id = item[1], item[3]
+            entry = self.entries[test_id]
+            entry.stand, entry.channel = key = heapq.heappop(self.free)
+            entry.state = "running"
+            entry.started = time.time()
+            self.channels[key] = test_id
+            self.vtime = tag
+            assigned.append(entry)
+        return assigned
+
+    def _live(self, item):
+        """False for heap items of removed runs, including ones since re-queued under the same id."""
+        entry = self.entries.get(item[3])
+        return entry is not None and entry.state == "queued" and entry.seq == item[2]
+
+    def release(self, test_id):
+        """Free the channel of a finished run; returns False for runs the allocator did not place."""
+        entry = self.entries.get(test_id)
+        if entry is None or entry.state != "running":
+            return False
+        del self.entries[test_id]
+        self._free_channel(entry)
+        return True
+
+    def requeue(self, test_id):
+        """Give back the channel of a dispatched run that could not start and queue it again at its place."""
+        entry = self.entries.get(test_id)
+        if entry is None or entry.state != "running":
+            return False
+        self._free_channel(entry)
+        entry.state, entry.stand, entry.channel, entry.started = "queued", None, None, None
+        heapq.heappush(self.queue, (-entry.priority, entry.tag, entry.seq, test_id))
+        return True
+
+    def _free_channel(self, entry):
+        key = (entry.stand, entry.channel)
+        if key in self.retired:
+            self.retired.discard(key)
+            del self.channels[key]
+        else:
+            self.channels[key] = None
+            heapq.heappush(self.free, key)
+
+    def get(self, test_id):
+        return self.entries.get(test_id)
+
+    def waits(self, now=None):
+        """Queue position and expected wait in seconds of every queued run.
+
+        Replays the queue order against each channel's expected release time (running runs end
+        after their planned duration), so this costs O(n log n) and runs only on reads.
+        """
+        now = time.time() if now is None else now
+        busy = []
+        for key, test_id in self.channels.items():
+            if key in self.retired:
+                continue
+            entry = self.entries.get(test_id) if test_id is not None else None
+            busy.append(max(now, entry.started + entry.duration) if entry is not None else now)
+        heapq.heapify(busy)
+        waits = {}
+        for position, (_, _, _, test_id) in enumerate(sorted(filter(self._live, self.queue)), 1):
+            if not busy:
+                waits[test_id] = (position, None)
+                continue
+            start = heapq.heappop(busy)
+            waits[test_id] = (position, start - now)
+            heapq.heappush(busy, start + self.entries[test_id].duration)
+        return waits
+
+    def stats(self):
+        busy = sum(1 for test_id in self.channels.values() if test_id is not None)
+        return {
+            "channels": len(self.channels),
+            "busy": busy,
+            "free": len(self.channels) - busy,
+            "queued": sum(1 for entry in self.entries.values() if entry.state == "queued"),
+        }
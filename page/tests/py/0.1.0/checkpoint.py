@@ -0,0 +1,56 @@
+"""
+Session checkpoints on local storage so running tests survive a backend restart
+"""
+
+import json
+import os
+
+from traces import check_id
+
+
+class CheckpointStore:
+    """One small JSON file per active session under ``root``, replaced atomically.
+
+    A checkpoint is written at state transitions and cycle boundaries only, so each one costs a
+    single fsync however many samples the cycle ingested; the samples themselves are already in
+    the session's trace file and are synced alongside.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, test_id):
+        return os.path.join(self.root, f"{check_id(test_id)}.json")
+
+    def save(self, test_id, state):
+        path = self.path(test_id)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def load(self):
+        """Every readable checkpoint; torn temporary files from a crash mid-write are discarded."""
+        states = []
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return states
+
+    def remove(self, test_id):
+        try:
+            os.remove(self.path(test_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,106 @@
+"""
+Trace downsampling for charts: min/max bucketing, LTTB and cached resolution pyramids
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+PYRAMID_FACTOR = 8  # samples per bucket between levels; min/max keeps 2 of them, so each level is ~4x smaller
+MIN_LEVEL_POINTS = 2000
+
+
+def minmax(t, p, bucket):
+    """Keep the min and max of every ``bucket`` consecutive samples, in time order."""
+    n = len(p)
+    if n <= 2 or bucket <= 1:
+        return t, p
+    buckets = -(-n // bucket)
+    padded = np.full(buckets * bucket, np.nan, dtype=np.float64)
+    padded[:n] = p
+    padded = padded.reshape(buckets, bucket)
+    base = np.arange(buckets) * bucket
+    lo = np.nanargmin(padded, axis=1) + base
+    hi = np.nanargmax(padded, axis=1) + base
+    idx = np.column_stack((np.minimum(lo, hi), np.maximum(lo, hi))).ravel()
+    idx = idx[np.concatenate(([True], idx[1:] != idx[:-1]))]
+    return t[idx], p[idx]
+
+
+def lttb(t, p, threshold):
+    """Largest-Triangle-Three-Buckets; the area search inside each bucket is vectorized."""
+    n = len(p)
+    if threshold >= n or threshold < 3:
+        return t, p
+    x = np.asarray(t, dtype=np.float64)
+    y = np.asarray(p, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Average of every bucket, used as the third triangle vertex for the bucket before it
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return t[selected], p[selected]
+
+
+class Pyramid:
+    """Precomputed min/max levels of one trace, each ~4x coarser than the one below."""
+
+    def __init__(self, t, p):
+        self.count = len(p)
+        self.levels = [(t, p)]
+        while len(self.levels[-1][1]) > MIN_LEVEL_POINTS:
+            self.levels.append(minmax(*self.levels[-1], PYRAMID_FACTOR))
+
+    def query(self, width, start=None, end=None, method="minmax"):
+        """Points for a chart ``width`` pixels wide over [start, end) seconds."""
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}")
+        target = 2 * width if method == "minmax" else width
+        for t, p in reversed(self.levels):
+            lo = 0 if start is None else int(np.searchsorted(t, start, side="left"))
+            hi = len(t) if end is None else int(np.searchsorted(t, end, side="left"))
+            if hi - lo >= target or t is self.levels[0][0]:
+                break
+        t, p = t[lo:hi], p[lo:hi]
+        if len(p) <= target:
+            return t, p
+        if method == "lttb":
+            return lttb(t, p, width)
+        return minmax(t, p, -(-len(p) // width))
+
+
+class PyramidCache:
+    """LRU of trace pyramids; an entry is rebuilt when its trace has grown since it was built."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key, count, load):
+        """Return the pyramid for ``key``, calling ``load() -> (t, p)`` when missing or stale."""
+        pyramid = self.entries.get(key)
+        if pyramid is not None and pyramid.count == count:
+            self.entries.move_to_end(key)
+            return pyramid
+        pyramid = self.entries[key] = Pyramid(*load())
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return pyramid
+
+    def drop(self, test_id):
+        for key in [k for k in self.entries if k[0] == test_id]:
+            del self.entries[key]
@@ -0,0 +1,158 @@
+"""
+Pass/fail evaluation of recorded pressure traces against wizard parameters
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+_RANGE_PATTERN = re.compile(r"(-?\d+(?:[.,]\d+)?)\s*(?:\.\.|–|-|:|to)\s*(-?\d+(?:[.,]\d+)?)")
+
+
+def parse_pressure_range(value):
+    """Accept {"min": a, "max": b}, [a, b] or strings like "-10..10" / "0-500 Pa"."""
+    if isinstance(value, dict):
+        low, high = value.get("min"), value.get("max")
+    elif isinstance(value, (list, tuple)) and len(value) == 2:
+        low, high = value
+    elif isinstance(value, str):
+        match = _RANGE_PATTERN.search(value)
+        if not match:
+            raise ValueError(f"Unrecognised pressure range: {value!r}")
+        low, high = (float(x.replace(",", ".")) for x in match.groups())
+    else:
+        raise ValueError(f"Unrecognised pressure range: {value!r}")
+    if low is None or high is None:
+        raise ValueError("Pressure range needs both min and max")
+    low, high = float(low), float(high)
+    if low > high:
+        low, high = high, low
+    return low, high
+
+
+@dataclass(frozen=True)
+class Criteria:
+    """Acceptance criteria of a run; ``duration`` is the whole run split evenly into ``cycles``."""
+
+    min_pressure: float
+    max_pressure: float
+    duration: float
+    cycles: int = 1
+    tolerance: float = 5.0  # percent of the pressure range span
+    hold: tuple = (0.0, 1.0)  # share of each cycle that is checked against the band
+
+    @classmethod
+    def from_parameters(cls, pressure_range, duration=300, cycles=1, tolerance=5):
+        low, high = parse_pressure_range(pressure_range)
+        if duration <= 0:
+            raise ValueError("duration must be positive")
+        if int(cycles) < 1:
+            raise ValueError("cycles must be at least 1")
+        if tolerance < 0:
+            raise ValueError("tolerance must not be negative")
+        return cls(low, high, float(duration), int(cycles), float(tolerance))
+
+    @property
+    def band(self):
+        margin = (self.max_pressure - self.min_pressure) * self.tolerance / 100.0
+        return self.min_pressure - margin, self.max_pressure + margin
+
+    @property
+    def cycle_length(self):
+        return self.duration / self.cycles
+
+
+def evaluate(timestamps, pressure, criteria):
+    """Evaluate a whole trace and each of its cycles in a handful of array passes."""
+    t = np.asarray(timestamps, dtype=np.float64)
+    p = np.asarray(pressure, dtype=np.float64)
+    low, high = criteria.band
+    result = {
+        "passed": False,
+        "result": "FAIL",
+        "samples": int(t.size),
+        "band": {"min": low, "max": high},
+        "reasons": [],
+    }
+    if t.size == 0:
+        result["reasons"].append("no samples recorded")
+        return result
+
+    n_cycles = criteria.cycles
+    elapsed = t - t[0]
+    covered = float(elapsed[-1])
+    cycle = np.minimum((elapsed // criteria.cycle_length).astype(np.int64), n_cycles - 1)
+    if criteria.hold != (0.0, 1.0):
+        position = elapsed / criteria.cycle_length - cycle
+        held = (position >= criteria.hold[0]) & (position < criteria.hold[1])
+        p, cycle = p[held], cycle[held]
+        if p.size == 0:
+            result["reasons"].append("no samples recorded during hold phases")
+            return result
+
+    counts = np.bincount(cycle, minlength=n_cycles)
+    present = counts > 0
+    starts = np.searchsorted(cycle, np.arange(n_cycles))
+    ends = starts + counts
+
+    mins = np.full(n_cycles, np.nan)
+    maxs = np.full(n_cycles, np.nan)
+    first = np.full(n_cycles, np.nan)
+    last = np.full(n_cycles, np.nan)
+    mins[present] = np.minimum.reduceat(p, starts[present])
+    maxs[present] = np.maximum.reduceat(p, starts[present])
+    first[present] = p[starts[present]]
+    last[present] = p[ends[present] - 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.bincount(cycle, weights=p, minlength=n_cycles) / counts
+
+    outside = (p < low) | (p > high)
+    excursion_starts = outside & ~np.concatenate(([False], outside[:-1]))
+    out_counts = np.bincount(cycle, weights=outside, minlength=n_cycles).astype(np.int64)
+    excursions = np.bincount(cycle, weights=excursion_starts, minlength=n_cycles).astype(np.int64)
+
+    mean_in_range = (means >= criteria.min_pressure) & (means <= criteria.max_pressure)
+    cycle_passed = present & mean_in_range & (out_counts == 0)
+
+    required = criteria.duration * (1.0 - criteria.tolerance / 100.0)
+    if covered < required:
+        result["reasons"].append(f"run covered {covered:.1f}s of required {required:.1f}s")
+    missing = np.flatnonzero(~present)
+    if missing.size:
+        result["reasons"].append(f"no samples in cycles {(missing + 1).tolist()}")
+    failed = np.flatnonzero(present & ~cycle_passed)
+    if failed.size:
+        result["reasons"].append(f"cycles {(failed + 1).tolist()} outside tolerance band")
+
+    def _values(arr):
+        return [None if np.isnan(v) else float(v) for v in arr]
+
+    result["cycles"] = [
+        {
+            "cycle": i + 1,
+            "samples": int(n),
+            "min": lo,
+            "max": hi,
+            "mean": mean,
+            "drop": None if a is None else a - b,
+            "out_of_band": int(out),
+            "excursions": int(exc),
+            "passed": bool(ok),
+        }
+        for i, (n, lo, hi, mean, a, b, out, exc, ok) in enumerate(zip(
+            counts, _values(mins), _values(maxs), _values(means), _values(first), _values(last),
+            out_counts, excursions, cycle_passed,
+        ))
+    ]
+    result["trace"] = {
+        "duration": covered,
+        "min": float(p.min()),
+        "max": float(p.max()),
+        "mean": float(p.mean()),
+        "out_of_band": int(out_counts.sum()),
+        "excursions": int(excursions.sum()),
+    }
+    result["passed"] = not result["reasons"]
+    result["result"] = "PASS" if result["passed"] else "FAIL"
+    return result
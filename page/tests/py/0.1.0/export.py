@@ -0,0 +1,82 @@
+"""
+Streaming serialisation of test history for bulk export
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+
+FORMATS = {
+    "json": ("application/json", "json"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xml": ("application/xml", "xml"),
+}
+
+CSV_HEADER = ["ID", "Name", "Device Type", "Device Model", "Serial", "Status", "Result", "Date", "Operator", "Duration"]
+CHUNK_ROWS = 500
+
+
+def chunks(runs, size=CHUNK_ROWS):
+    runs = iter(runs)
+    while chunk := list(islice(runs, size)):
+        yield chunk
+
+
+def json_stream(runs):
+    yield "["
+    separator = ""
+    for chunk in chunks(runs):
+        yield separator + ",".join(json.dumps(run, separators=(",", ":")) for run in chunk)
+        separator = ","
+    yield "]"
+
+
+def csv_stream(runs):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for chunk in chunks(runs):
+        for run in chunk:
+            device = run["device"]
+            writer.writerow([
+                run["id"], run["name"], device["deviceType"] or "N/A", device["deviceModel"] or "",
+                device["serial"] or "", run["status"], run["result"] or "N/A", run["date"],
+                run["createdBy"] or "", "" if run["duration"] is None else run["duration"],
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def xml_stream(runs, user=None):
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<testData>\n'
+        f"    <timestamp>{timestamp}</timestamp>\n"
+        f"    <user>{escape(user or '')}</user>\n"
+        "    <testHistory>\n"
+    )
+    for chunk in chunks(runs):
+        yield "".join(
+            "        <test id={} name={} deviceType={} status={} result={} date={}/>\n".format(
+                quoteattr(run["id"]), quoteattr(run["name"]), quoteattr(run["device"]["deviceType"] or ""),
+                quoteattr(run["status"]), quoteattr(run["result"] or ""), quoteattr(run["date"]),
+            )
+            for run in chunk
+        )
+    yield "    </testHistory>\n</testData>\n"
+
+
+def stream(fmt, runs, user=None):
+    if fmt == "json":
+        return json_stream(runs)
+    if fmt == "csv":
+        return csv_stream(runs)
+    if fmt == "xml":
+        return xml_stream(runs, user)
+    raise ValueError(f"Unsupported export format: {fmt}")
@@ -0,0 +1,200 @@
+"""
+Persistent test-run history with keyset pagination
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_runs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    device_type TEXT,
+    device_model TEXT,
+    device_serial TEXT,
+    test_type TEXT,
+    test_standard TEXT,
+    status TEXT NOT NULL,
+    result TEXT,
+    operator TEXT,
+    started_at TEXT NOT NULL,
+    duration REAL,
+    parameters TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON test_runs (started_at, id);
+CREATE INDEX IF NOT EXISTS idx_runs_device_type ON test_runs (device_type, started_at, id);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON test_runs (status, started_at, id);
+CREATE INDEX IF NOT EXISTS idx_runs_operator ON test_runs (operator, started_at, id);
+"""
+
+COLUMNS = (
+    "id", "name", "device_type", "device_model", "device_serial", "test_type", "test_standard",
+    "status", "result", "operator", "started_at", "duration", "parameters",
+)
+
+# Query parameter -> indexed column; "all" disables the filter like historyFilter in tests.js
+FILTERS = {
+    "device_type": "device_type",
+    "status": "status",
+    "operator": "operator",
+    "result": "result",
+}
+
+MAX_PAGE_SIZE = 500
+
+
+def utc_timestamp(value=None):
+    """Normalise a datetime/ISO string to a sortable UTC 'YYYY-MM-DDTHH:MM:SS' string."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00").replace(" ", "T"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def encode_cursor(started_at, run_id):
+    raw = json.dumps([started_at, run_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        started_at, run_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(started_at), str(run_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def run_to_row(run):
+    """Flatten a tests.js-shaped run ({device: {...}, test: {...}, parameters: {...}}) into a row."""
+    device = run.get("device") or {}
+    test = run.get("test") or {}
+    return (
+        run["id"],
+        run.get("name") or run["id"],
+        device.get("deviceType"),
+        device.get("deviceModel"),
+        device.get("serial"),
+        test.get("testType"),
+        test.get("testStandard"),
+        run.get("status") or "configured",
+        run.get("result"),
+        run.get("createdBy"),
+        utc_timestamp(run.get("date") or run.get("created")),
+        run.get("duration"),
+        json.dumps(run.get("parameters") or {}, separators=(",", ":")),
+    )
+
+
+def row_to_run(row):
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "device": {
+            "deviceType": row["device_type"],
+            "deviceModel": row["device_model"],
+            "serial": row["device_serial"],
+        },
+        "test": {"testType": row["test_type"], "testStandard": row["test_standard"]},
+        "parameters": json.loads(row["parameters"]),
+        "status": row["status"],
+        "result": row["result"],
+        "duration": row["duration"],
+        "date": row["started_at"],
+        "createdBy": row["operator"],
+    }
+
+
+class HistoryStore:
+    """SQLite-backed run history; newest first, paginated by (started_at, id) cursor."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def record(self, run):
+        return self.record_many([run])
+
+    def record_many(self, runs):
+        """Insert or replace runs in a single transaction."""
+        rows = [run_to_row(run) for run in runs]
+        placeholders = ", ".join("?" * len(COLUMNS))
+        with self.lock, self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO test_runs ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows
+            )
+        return len(rows)
+
+    def get(self, run_id):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM test_runs WHERE id = ?", (run_id,)).fetchone()
+        return row_to_run(row) if row else None
+
+    def validate_filters(self, filters=None, date_from=None, date_to=None):
+        """Raise ValueError for filters ``page`` would reject, without querying; e.g. before a lazy ``iterate``."""
+        self._where(filters, date_from, date_to)
+
+    def _where(self, filters, date_from, date_to):
+        where, params = [], []
+        for key, value in (filters or {}).items():
+            if value is None or value == "all":
+                continue
+            if key not in FILTERS:
+                raise ValueError(f"Unknown filter: {key}")
+            where.append(f"{FILTERS[key]} = ?")
+            params.append(value)
+        if date_from:
+            where.append("started_at >= ?")
+            params.append(utc_timestamp(date_from))
+        if date_to:
+            if len(date_to) == 10:  # a bare date includes the whole day
+                date_to += "T23:59:59"
+            where.append("started_at <= ?")
+            params.append(utc_timestamp(date_to))
+        return where, params
+
+    def page(self, filters=None, date_from=None, date_to=None, limit=50, cursor=None):
+        """Return one page of runs plus the cursor of the next page (None on the last page)."""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        where, params = self._where(filters, date_from, date_to)
+        if cursor:
+            where.append("(started_at, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        sql = "SELECT * FROM test_runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["started_at"], rows[-1]["id"]) if more else None
+        return {"items": [row_to_run(row) for row in rows], "next_cursor": next_cursor}
+
+    def iterate(self, filters=None, date_from=None, date_to=None, batch=MAX_PAGE_SIZE):
+        """Yield every matching run, newest first, one keyset page at a time."""
+        cursor = None
+        while True:
+            page = self.page(filters, date_from, date_to, batch, cursor)
+            yield from page["items"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,165 @@
+"""
+Live pressure-sample buffers for running tests
+"""
+
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CAPACITY = 500 * 600  # 10 minutes per channel at 500 Hz
+MAX_CHANNELS = 16
+MAX_TESTS = 1024  # buffered tests; above the scheduler's session limit, so only idle tests are evicted by count
+IDLE_TTL = 900.0  # seconds without samples before a test's buffers are evicted
+
+
+class RingBuffer:
+    """Fixed-capacity columnar ring buffer of (timestamp, pressure) samples."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.timestamps = np.empty(capacity, dtype=np.float64)
+        self.pressure = np.empty(capacity, dtype=np.float32)
+        self.head = 0  # next write position
+        self.size = 0
+        self.total = 0  # samples written since creation, including overwritten ones
+
+    def extend(self, timestamps, pressure):
+        """Append a batch; the oldest samples are overwritten once full."""
+        n = len(timestamps)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            timestamps = timestamps[-self.capacity:]
+            pressure = pressure[-self.capacity:]
+            self.timestamps[:] = timestamps
+            self.pressure[:] = pressure
+            self.head = 0
+            self.size = self.capacity
+            self.total += n
+            return
+
+        first = min(n, self.capacity - self.head)
+        self.timestamps[self.head:self.head + first] = timestamps[:first]
+        self.pressure[self.head:self.head + first] = pressure[:first]
+        rest = n - first
+        if rest:
+            self.timestamps[:rest] = timestamps[first:]
+            self.pressure[:rest] = pressure[first:]
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        self.total += n
+
+    def snapshot(self, last=None):
+        """Return the buffered samples in arrival order as (timestamps, pressure) copies."""
+        count = self.size if last is None else max(0, min(last, self.size))
+        start = (self.head - count) % self.capacity
+        if start + count <= self.capacity:
+            return (self.timestamps[start:start + count].copy(),
+                    self.pressure[start:start + count].copy())
+        idx = np.arange(start, start + count) % self.capacity
+        return self.timestamps[idx], self.pressure[idx]
+
+    @property
+    def last_timestamp(self):
+        if self.size == 0:
+            return None
+        return float(self.timestamps[(self.head - 1) % self.capacity])
+
+
+class TestBuffer:
+    """Per-test set of channel ring buffers."""
+
+    def __init__(self, test_id, capacity=DEFAULT_CAPACITY):
+        self.test_id = test_id
+        self.capacity = capacity
+        self.channels = {}
+        self.created = time.time()
+        self.updated = self.created
+
+    def channel(self, channel):
+        buf = self.channels.get(channel)
+        if buf is None:
+            if len(self.channels) >= MAX_CHANNELS:
+                raise ValueError(f"Test {self.test_id} already has {MAX_CHANNELS} channels")
+            buf = self.channels[channel] = RingBuffer(self.capacity)
+        return buf
+
+    def append(self, channel, timestamps, pressure):
+        buf = self.channel(channel)
+        buf.extend(timestamps, pressure)
+        self.updated = time.time()
+        return buf
+
+    def stats(self):
+        return {
+            "test_id": self.test_id,
+            "capacity": self.capacity,
+            "created": self.created,
+            "updated": self.updated,
+            "channels": {
+                str(ch): {"buffered": buf.size, "total": buf.total, "last_timestamp": buf.last_timestamp}
+                for ch, buf in sorted(self.channels.items())
+            },
+        }
+
+
+class SampleStore:
+    """Registry of live test buffers keyed by test id, least recently updated first.
+
+    Buffers of tests that stopped streaming are evicted after ``idle_ttl`` seconds, and the least
+    recently updated ones beyond ``max_tests``; ``on_evict(test_id)`` is called for each so state
+    kept elsewhere for the test can be released with it. Eviction runs when a new test starts.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_tests=MAX_TESTS, idle_ttl=IDLE_TTL, on_evict=None):
+        self.capacity = capacity
+        self.max_tests = max_tests
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self.tests = OrderedDict()
+
+    def get(self, test_id):
+        return self.tests.get(test_id)
+
+    def validate(self, test_id, channel, timestamps, pressure):
+        """Check a batch against the test's buffers without changing them; returns it as arrays."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        pressure = np.asarray(pressure, dtype=np.float32)
+        if timestamps.shape != pressure.shape or timestamps.ndim != 1:
+            raise ValueError("timestamps and pressure must be flat arrays of equal length")
+        if timestamps.size > 1 and np.any(np.diff(timestamps) < 0):
+            raise ValueError("timestamps must be non-decreasing within a batch")
+        buffer = self.tests.get(test_id)
+        if buffer is not None and channel not in buffer.channels and len(buffer.channels) >= MAX_CHANNELS:
+            raise ValueError(f"Test {test_id} already has {MAX_CHANNELS} channels")
+        last = buffer.channels[channel].last_timestamp if buffer is not None and channel in buffer.channels else None
+        if last is not None and timestamps.size and timestamps[0] < last:
+            raise ValueError("batch starts before the last buffered sample")
+        return timestamps, pressure
+
+    def ingest(self, test_id, channel, timestamps, pressure):
+        timestamps, pressure = self.validate(test_id, channel, timestamps, pressure)
+        buffer = self.tests.get(test_id)
+        if buffer is None:
+            self.evict(reserve=1)
+            buffer = self.tests[test_id] = TestBuffer(test_id, self.capacity)
+        self.tests.move_to_end(test_id)
+        return buffer.append(channel, timestamps, pressure)
+
+    def evict(self, reserve=0):
+        """Drop idle buffers, then the least recently updated until ``reserve`` more fit; returns their ids."""
+        cutoff = time.time() - self.idle_ttl
+        evicted = []
+        while self.tests:
+            test_id, buffer = next(iter(self.tests.items()))
+            if buffer.updated > cutoff and len(self.tests) + reserve <= self.max_tests:
+                break
+            del self.tests[test_id]
+            evicted.append(test_id)
+            if self.on_evict is not None:
+                self.on_evict(test_id)
+        return evicted
+
+    def drop(self, test_id):
+        return self.tests.pop(test_id, None) is not None
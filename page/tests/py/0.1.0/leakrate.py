@@ -0,0 +1,165 @@
+"""
+Live leak-rate estimation from a sliding-window linear regression over ingested samples
+"""
+
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_WINDOW = 10.0  # seconds of samples in the regression
+PUBLISH_INTERVAL = 0.5  # seconds between published estimates
+REBASE_FACTOR = 4  # recompute the sums exactly after this many windows' worth of samples
+
+
+class SlidingRegression:
+    """Least-squares line over the last ``window`` seconds, kept as running sums.
+
+    Each batch adds its sums and expired samples are subtracted, so the cost per sample is O(1)
+    regardless of the window length. Times are stored relative to an origin that is moved to the
+    window start on every periodic rebase, which also discards accumulated rounding error.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.batches = deque()
+        self.origin = None
+        self.first = None
+        self.last = None
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+        self.since_rebase = 0
+
+    def add(self, timestamps, pressure):
+        t = np.asarray(timestamps, dtype=np.float64)
+        y = np.asarray(pressure, dtype=np.float64)
+        if t.size == 0:
+            return
+        if self.origin is None:
+            self.origin = self.first = float(t[0])
+        x = t - self.origin
+        self.batches.append((x, y))
+        self._apply(x, y, 1)
+        self.last = float(t[-1])
+        self._expire(x[-1] - self.window)
+        self.since_rebase += t.size
+        if self.since_rebase > REBASE_FACTOR * max(self.n, 1):
+            self._rebase()
+
+    def _apply(self, x, y, sign):
+        self.n += sign * x.size
+        self.sx += sign * float(x.sum())
+        self.sy += sign * float(y.sum())
+        self.sxx += sign * float(np.dot(x, x))
+        self.sxy += sign * float(np.dot(x, y))
+
+    def _expire(self, cutoff):
+        while self.batches:
+            x, y = self.batches[0]
+            if x[-1] < cutoff:
+                self.batches.popleft()
+                self._apply(x, y, -1)
+                continue
+            k = int(np.searchsorted(x, cutoff, side="left"))
+            if k:
+                self._apply(x[:k], y[:k], -1)
+                self.batches[0] = (x[k:], y[k:])
+            return
+
+    def _rebase(self):
+        shift = float(self.batches[0][0][0])
+        self.batches = deque((x - shift, y) for x, y in self.batches)
+        self.origin += shift
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+        for x, y in self.batches:
+            self._apply(x, y, 1)
+        self.since_rebase = 0
+
+    def fit(self):
+        """Return (slope, pressure at the newest sample) or None while underdetermined."""
+        if self.n < 2:
+            return None
+        denominator = self.n * self.sxx - self.sx * self.sx
+        if denominator <= 1e-12 * self.n * self.sxx:
+            return None
+        slope = (self.n * self.sxy - self.sx * self.sy) / denominator
+        intercept = (self.sy - slope * self.sx) / self.n
+        return slope, intercept + slope * (self.last - self.origin)
+
+
+def leak_estimate(regression, criteria=None):
+    fit = regression.fit()
+    if fit is None:
+        return None
+    slope, pressure = fit
+    estimate = {
+        "leak_rate": -slope,
+        "pressure": pressure,
+        "samples": regression.n,
+        "window": regression.window,
+        "elapsed": regression.last - regression.first,
+    }
+    if criteria is not None:
+        low, high = criteria.band
+        remaining = max(0.0, criteria.duration - estimate["elapsed"])
+        projected = pressure + slope * remaining
+        estimate["projected_end_pressure"] = projected
+        estimate["projected_result"] = "PASS" if low <= projected <= high else "FAIL"
+        estimate["time_to_limit"] = (pressure - low) / -slope if slope < 0 and pressure > low else None
+    return estimate
+
+
+class LeakRateMonitor:
+    """Per (test, channel) regressions fed on ingest and published at a fixed rate.
+
+    Ingest only updates running sums; fitting and projection happen once per ``interval`` for
+    channels that received samples, so the cost of a live test does not grow with its sample rate.
+    ``criteria_for(test_id)`` may return the run's Criteria to add a projected pass/fail.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, interval=PUBLISH_INTERVAL, criteria_for=None):
+        self.window = window
+        self.interval = interval
+        self.criteria_for = criteria_for
+        self.regressions = {}
+        self.dirty = set()
+        self.published = {}
+        self.changed = asyncio.Event()
+
+    def update(self, test_id, channel, timestamps, pressure):
+        key = (test_id, channel)
+        regression = self.regressions.get(key)
+        if regression is None:
+            regression = self.regressions[key] = SlidingRegression(self.window)
+        regression.add(timestamps, pressure)
+        self.dirty.add(key)
+
+    def drop(self, test_id):
+        for key in [k for k in self.regressions if k[0] == test_id]:
+            del self.regressions[key]
+            self.published.pop(key, None)
+            self.dirty.discard(key)
+
+    def latest(self, test_id, channel):
+        return self.published.get((test_id, channel))
+
+    def publish(self):
+        now = time.time()
+        for key in self.dirty:
+            regression = self.regressions.get(key)
+            if regression is None:
+                continue
+            criteria = self.criteria_for(key[0]) if self.criteria_for else None
+            estimate = leak_estimate(regression, criteria)
+            if estimate is not None:
+                self.published[key] = {"test_id": key[0], "channel": key[1], "published": now, **estimate}
+        self.dirty.clear()
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.publish()
@@ -2,10 +2,46 @@
 FastAPI backend for tests page
 """
 
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import secrets
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, ConfigDict, Field
+
+from allocator import MAX_PRIORITY, ChannelAllocator
+from checkpoint import CheckpointStore
+from downsample import METHODS, PyramidCache
+from evaluation import Criteria, evaluate
+from export import FORMATS, stream
+from history import HistoryStore
+from ingest import MAX_CHANNELS, SampleStore
+from leakrate import LeakRateMonitor
+from plans import SOURCES, PlanCache, plan_spec
+from scheduler import SessionScheduler
+from standards import RULESETS, check_batch, check_trace, load_limits, resolve
+from traces import MAX_CHANNEL, NS, TraceStore, check_id, map_trace, repair, time_slice
+
+
+@asynccontextmanager
+async def lifespan(app):
+    resume_sessions()
+    publisher = asyncio.create_task(leak_rates.run())
+    yield
+    publisher.cancel()
+    await scheduler.shutdown()
+    traces.close_all()
 
-app = FastAPI(title="MaskService Tests API", version="0.1.0")
+
+app = FastAPI(title="MaskService Tests API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +51,306 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+DATA_DIR = os.environ.get("TESTS_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+os.makedirs(DATA_DIR, exist_ok=True)
+# site stand procedure limits per standard; the built-in ones are placeholders
+LIMITS_FILE = os.environ.get("TESTS_LIMITS_FILE", os.path.join(DATA_DIR, "limits.json"))
+if "TESTS_LIMITS_FILE" in os.environ or os.path.exists(LIMITS_FILE):
+    load_limits(LIMITS_FILE)
+
+samples = SampleStore(on_evict=lambda test_id: forget_test(test_id))
+history = HistoryStore(os.path.join(DATA_DIR, "history.db"))
+plans = PlanCache()
+traces = TraceStore(os.path.join(DATA_DIR, "traces"))
+checkpoints = CheckpointStore(os.path.join(DATA_DIR, "sessions"))
+pyramids = PyramidCache()
+
+MAX_JSON_SAMPLES = 20000
+MAX_BATCH_TESTS = 5000
+
+
+def session_samples(session):
+    """The whole run of a session from its trace file; the ring buffer, which only keeps the latest
+    samples, is the fallback when no trace was recorded."""
+    try:
+        if traces.exists(session.test_id, session.channel):
+            return load_trace(session.test_id, session.channel)
+    except ValueError:
+        pass
+    buffer = samples.get(session.test_id)
+    if buffer is not None and session.channel in buffer.channels:
+        return buffer.channels[session.channel].snapshot()
+    return None
+
+
+def record_session(session):
+    """Evaluate a finished session's recorded samples and store the run in the history."""
+    traces.close(session.test_id)
+    run = session_samples(session) if session.state == "completed" else None
+    if run is not None:
+        session.result = evaluate(*run, session.plan.criteria)["result"]
+    plan = session.plan
+    previous = history.get(session.test_id) or {}  # keeps serials and batch ids of pre-created runs
+    device = {"deviceType": plan.device_type, "deviceModel": plan.device_model}
+    test = {"testType": plan.test_type, "testStandard": plan.test_standard}
+    history.record({
+        "id": session.test_id,
+        "name": session.name,
+        "device": {**(previous.get("device") or {}), **{k: v for k, v in device.items() if v is not None}},
+        "test": {**(previous.get("test") or {}), **{k: v for k, v in test.items() if v is not None}},
+        "parameters": {
+            **(previous.get("parameters") or {}),
+            "plan_id": plan.plan_id,
+            "plan_spec": plan_spec(plan),
+            "reason": session.reason,
+            "alerts": len(session.alerts),
+        },
+        "status": session.state,
+        "result": session.result,
+        "duration": session.finished - session.started if session.started else None,
+        "createdBy": session.operator,
+    })
+    checkpoints.remove(session.test_id)
+    samples.drop(session.test_id)
+    forget_test(session.test_id)
+
+
+def forget_test(test_id):
+    """Release the in-memory state of a test that no longer streams; its trace file stays on disk."""
+    traces.close(test_id)
+    pyramids.drop(test_id)
+    leak_rates.drop(test_id)
+
+
+def finish_session(session):
+    try:
+        record_session(session)
+    finally:
+        allocator.release(session.test_id)  # never leave the stand channel held
+        start_allocated()  # the freed channel or scheduler slot may start a queued run
+
+
+def start_allocated():
+    """Start a session for every queued run the allocator placed on a free channel.
+
+    While the scheduler is at its session limit, dispatched runs go back to the queue and wait
+    for a session to finish.
+    """
+    while assigned := allocator.dispatch():
+        for index, entry in enumerate(assigned):
+            if scheduler.active_count() >= scheduler.max_sessions:
+                for waiting in assigned[index:]:
+                    allocator.requeue(waiting.test_id)
+                return
+            try:
+                scheduler.start(entry.test_id, entry.plan, entry.channel, entry.operator, entry.name)
+            except ValueError:
+                allocator.release(entry.test_id)  # a session of that id is already running and records the run
+
+
+def checkpoint_session(session):
+    """Sync the session's trace and persist its state; called at cycle boundaries and shutdown."""
+    samples_synced = traces.sync(session.test_id, session.channel)
+    checkpoints.save(session.test_id, {**session.checkpoint(), "spec": plan_spec(session.plan), "samples": samples_synced})
+
+
+def resume_sessions():
+    """Reload checkpointed sessions: refill their buffers from the trace files, then resume or abort."""
+    for state in checkpoints.load():
+        test_id, channel = state["test_id"], state["channel"]
+        try:
+            plan = plans.restore(state["plan_id"], state["spec"])
+        except (KeyError, ValueError):
+            checkpoints.remove(test_id)
+            continue
+        path = traces.path(test_id, channel)
+        last_seen = None
+        if os.path.exists(path):
+            last_seen = os.path.getmtime(path)  # before repair() touches the file
+            if repair(path):
+                header, records = map_trace(path)
+                samples.ingest(test_id, channel, records["t"] / NS, records["p"])
+        scheduler.resume(state, plan, last_seen)
+
+
+def session_criteria(test_id):
+    session = scheduler.get(test_id)
+    return session.plan.criteria if session is not None else None
+
+
+scheduler = SessionScheduler(samples, on_finish=finish_session, on_checkpoint=checkpoint_session)
+allocator = ChannelAllocator()
+leak_rates = LeakRateMonitor(criteria_for=session_criteria)
+
+
+class SampleBatch(BaseModel):
+    channel: int = Field(0, ge=0, le=MAX_CHANNEL)
+    pressure: List[float]
+    timestamps: Optional[List[float]] = None
+    t0: Optional[float] = None
+    sample_rate: Optional[float] = Field(None, gt=0)
+
+
+class EvaluationRequest(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    channel: int = Field(0, ge=0, le=MAX_CHANNEL)
+    plan_id: Optional[str] = None
+    pressure_range: Any = Field(None, alias="pressureRange")
+    duration: float = 300
+    cycles: int = 1
+    tolerance: float = 5
+
+
+class TestRun(BaseModel):
+    id: str
+    name: Optional[str] = None
+    device: Dict[str, Any] = {}
+    test: Dict[str, Any] = {}
+    parameters: Dict[str, Any] = {}
+    status: str = "configured"
+    result: Optional[str] = None
+    duration: Optional[float] = None
+    date: Optional[str] = None
+    createdBy: Optional[str] = None
+
+
+class PlanRequest(BaseModel):
+    source: str = Field(..., pattern="^(" + "|".join(SOURCES) + ")$")
+    data: Dict[str, Any]
+    overrides: Dict[str, Any] = {}
+
+
+class SessionRequest(BaseModel):
+    test_id: str
+    plan_id: str
+    channel: int = Field(0, ge=0, le=MAX_CHANNEL)
+    operator: Optional[str] = None
+    name: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    template: Dict[str, Any]
+    serials: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_TESTS)
+    operator: Optional[str] = None
+    overrides: Dict[str, Any] = {}
+    queue: bool = False
+    priority: int = Field(0, ge=0, le=MAX_PRIORITY)
+
+
+class StandRequest(BaseModel):
+    channels: int = Field(..., ge=0, le=MAX_CHANNELS)
+
+
+class QueueRequest(BaseModel):
+    test_id: str
+    plan_id: str
+    operator: Optional[str] = None
+    priority: int = Field(0, ge=0, le=MAX_PRIORITY)
+    name: Optional[str] = None
+
+
+class ComplianceRequest(BaseModel):
+    standard: Optional[str] = None
+    channel: int = Field(0, ge=0, le=MAX_CHANNEL)
+    plan_id: Optional[str] = None
+
+
+class ComplianceBatchRequest(BaseModel):
+    standard: Optional[str] = None
+    test_ids: Optional[List[str]] = None
+    channel: int = Field(0, ge=0, le=MAX_CHANNEL)
+    plan_id: Optional[str] = None
+    device_type: Optional[str] = None
+    status: str = "completed"
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+
+
+def batch_timestamps(batch):
+    if batch.timestamps is not None:
+        return batch.timestamps
+    if batch.t0 is None or batch.sample_rate is None:
+        raise HTTPException(status_code=422, detail="Provide timestamps or t0 with sample_rate")
+    return batch.t0 + np.arange(len(batch.pressure), dtype=np.float64) / batch.sample_rate
+
+
+def get_buffer(test_id):
+    buffer = samples.get(test_id)
+    if buffer is None:
+        raise HTTPException(status_code=404, detail=f"No samples for test {test_id}")
+    return buffer
+
+
+def get_plan(plan_id):
+    plan = plans.get(plan_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail=f"Plan {plan_id} not compiled")
+    return plan
+
+
+def trace_path(test_id, channel):
+    try:
+        path = traces.path(test_id, channel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"No trace for test {test_id} channel {channel}")
+    return path
+
+
+def get_channel(test_id, channel):
+    buffer = get_buffer(test_id)
+    if channel not in buffer.channels:
+        raise HTTPException(status_code=404, detail=f"No samples on channel {channel}")
+    return buffer.channels[channel]
+
+
+def queue_view(entry, waits):
+    position, expected_wait = waits.get(entry.test_id, (0, 0.0))
+    return {**entry.to_dict(), "position": position, "expected_wait": expected_wait}
+
+
+def run_standard(test_id, requested=None, run=None):
+    """Standard named in the request, else the one of the run's plan or history record."""
+    if requested:
+        return resolve(requested)
+    session = scheduler.get(test_id)
+    if session is not None:
+        name, device_type = session.plan.test_standard, session.plan.device_type
+    else:
+        run = run or history.get(test_id) or {}
+        name, device_type = (run.get("test") or {}).get("testStandard"), (run.get("device") or {}).get("deviceType")
+    try:
+        return resolve(name, device_type)
+    except ValueError:
+        return resolve(None, device_type)  # unrecognised free-text standard: fall back to the device type
+
+
+def run_criteria(test_id, plan_id=None, run=None):
+    """Cycle layout of a run: requested plan, live session plan, recorded plan (rebuilt from its stored
+    spec when no longer cached) or None."""
+    if plan_id:
+        return get_plan(plan_id).criteria
+    session = scheduler.get(test_id)
+    if session is not None:
+        return session.plan.criteria
+    parameters = (run or history.get(test_id) or {}).get("parameters") or {}
+    plan_id, spec = parameters.get("plan_id"), parameters.get("plan_spec")
+    recorded = plans.get(plan_id or "")
+    if recorded is None and plan_id and spec:
+        try:
+            recorded = plans.restore(plan_id, spec)  # compiled before a restart or evicted from the cache
+        except (KeyError, TypeError, ValueError):
+            pass
+    return recorded.criteria if recorded is not None else None
+
+
+def load_trace(test_id, channel):
+    header, records = map_trace(traces.path(test_id, channel))
+    return records["t"] / NS, records["p"]
+
+
 @app.get("/")
 async def root():
     return {"message": "MaskService Tests API v0.1.0", "status": "active"}
@@ -23,6 +359,414 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "tests", "version": "0.1.0"}
 
+@app.post("/api/tests/batch")
+async def create_test_batch(request: BatchRequest):
+    """Instantiate a template for every serial in one history transaction, optionally queueing the runs.
+
+    Test ids are ``<batch_id>_<NNNN>`` in the order of the (de-duplicated) serials.
+    """
+    template = request.template
+    plan = None
+    has_range = any(
+        "pressureRange" in part
+        for part in (template.get("test") or {}, template.get("parameters") or {}, request.overrides)
+    )
+    if request.queue or has_range:
+        try:
+            plan, _ = plans.compile("template", template, request.overrides)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    serials, skipped, seen = [], [], set()
+    for serial in (s.strip() for s in request.serials):
+        if not serial or serial in seen:
+            skipped.append(serial)
+            continue
+        seen.add(serial)
+        serials.append(serial)
+
+    created = datetime.now(timezone.utc)
+    batch_id = f"batch_{created:%Y%m%d%H%M%S}_{secrets.token_hex(3)}"
+    name = template.get("name") or template.get("templateName") or "Test"
+    device = template.get("device") or {}
+    parameters = {
+        **(template.get("parameters") or {}),
+        "batch_id": batch_id,
+        "template_id": template.get("id"),
+        "plan_id": plan.plan_id if plan is not None else None,
+        "plan_spec": plan_spec(plan) if plan is not None else None,
+    }
+    runs = [
+        {
+            "id": f"{batch_id}_{index:04d}",
+            "name": f"{name} - {serial}",
+            "device": {**device, "serial": serial},
+            "test": template.get("test") or {},
+            "parameters": parameters,
+            "status": "queued" if request.queue else "configured",
+            "date": created.isoformat(),
+            "createdBy": request.operator,
+        }
+        for index, serial in enumerate(serials)
+    ]
+    try:
+        await run_in_threadpool(history.record_many, runs)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if request.queue:
+        for run in runs:
+            allocator.enqueue(run["id"], plan, request.operator, request.priority, run["name"])
+        start_allocated()
+    return {
+        "batch_id": batch_id,
+        "created": len(runs),
+        "first_id": runs[0]["id"] if runs else None,
+        "last_id": runs[-1]["id"] if runs else None,
+        "plan_id": parameters["plan_id"],
+        "queued": len(runs) if request.queue else 0,
+        "skipped": skipped,
+    }
+
+@app.post("/api/tests/{test_id}/samples")
+async def ingest_samples(test_id: str, batch: SampleBatch):
+    timestamps = batch_timestamps(batch)
+    try:
+        check_id(test_id)
+        timestamps, pressure = samples.validate(test_id, batch.channel, timestamps, batch.pressure)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    traces.append(test_id, batch.channel, timestamps, pressure)  # first, so a failed write leaves the buffer as it was
+    buffer = samples.ingest(test_id, batch.channel, timestamps, pressure)
+    leak_rates.update(test_id, batch.channel, timestamps, batch.pressure)
+    return {"test_id": test_id, "channel": batch.channel, "accepted": len(batch.pressure), "total": buffer.total}
+
+@app.get("/api/tests/{test_id}/samples")
+async def read_samples(test_id: str, channel: int = 0, last: Optional[int] = None):
+    timestamps, pressure = get_channel(test_id, channel).snapshot(last)
+    return {"test_id": test_id, "channel": channel, "timestamps": timestamps.tolist(), "pressure": pressure.tolist()}
+
+@app.get("/api/tests/{test_id}/buffer")
+async def buffer_stats(test_id: str):
+    return get_buffer(test_id).stats()
+
+@app.post("/api/tests/{test_id}/evaluate")
+async def evaluate_test(test_id: str, request: EvaluationRequest):
+    channel = get_channel(test_id, request.channel)
+    if request.plan_id:
+        criteria = get_plan(request.plan_id).criteria
+    else:
+        try:
+            criteria = Criteria.from_parameters(request.pressure_range, request.duration, request.cycles, request.tolerance)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    timestamps, pressure = channel.snapshot()
+    return {"test_id": test_id, "channel": request.channel, **evaluate(timestamps, pressure, criteria)}
+
+@app.get("/api/tests/{test_id}/leak-rate")
+async def read_leak_rate(test_id: str, channel: int = 0):
+    estimate = leak_rates.latest(test_id, channel)
+    if estimate is None:
+        raise HTTPException(status_code=404, detail=f"No leak-rate estimate for test {test_id} channel {channel}")
+    return estimate
+
+@app.get("/api/tests/{test_id}/leak-rate/stream")
+async def stream_leak_rate(test_id: str, channel: int = 0):
+    """Server-sent events carrying each newly published estimate of the channel."""
+    async def events():
+        last = None
+        while True:
+            await leak_rates.changed.wait()
+            estimate = leak_rates.latest(test_id, channel)
+            if estimate is not None and estimate["published"] != last:
+                last = estimate["published"]
+                yield f"data: {json.dumps(estimate)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/api/tests/{test_id}/samples")
+async def drop_samples(test_id: str):
+    forget_test(test_id)
+    if not samples.drop(test_id):
+        raise HTTPException(status_code=404, detail=f"No samples for test {test_id}")
+    return {"test_id": test_id, "dropped": True}
+
+@app.post("/api/tests/{test_id}/compliance")
+def check_compliance(test_id: str, request: ComplianceRequest):
+    """Check a recorded trace against a standard's rules, with per-rule and per-cycle detail."""
+    trace_path(test_id, request.channel)
+    try:
+        standard = run_standard(test_id, request.standard)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    t, p = load_trace(test_id, request.channel)
+    report = check_trace(standard, t, p, run_criteria(test_id, request.plan_id))
+    return {"test_id": test_id, "channel": request.channel, **report}
+
+@app.get("/api/standards")
+async def list_standards():
+    return {"standards": [ruleset.describe() for ruleset in RULESETS.values()]}
+
+@app.post("/api/standards/check")
+def check_compliance_batch(request: ComplianceBatchRequest):
+    """Certification batch: check many recorded runs, grouped by standard, in vectorized chunks."""
+    if request.plan_id:
+        get_plan(request.plan_id)
+    try:
+        if request.standard:
+            resolve(request.standard)
+        if request.test_ids is not None:
+            runs = [history.get(test_id) or {"id": test_id} for test_id in request.test_ids]
+        else:
+            filters = {"device_type": request.device_type, "status": request.status}
+            history.validate_filters(filters, request.date_from, request.date_to)  # iterate() is lazy
+            runs = history.iterate(filters, request.date_from, request.date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    groups, skipped = {}, []
+    for run in runs:
+        try:
+            check_id(run["id"])
+            standard = run_standard(run["id"], request.standard, run)
+        except ValueError as e:
+            skipped.append({"id": run["id"], "reason": str(e)})
+            continue
+        if not os.path.exists(traces.path(run["id"], request.channel)):
+            skipped.append({"id": run["id"], "reason": f"no trace on channel {request.channel}"})
+            continue
+        groups.setdefault(standard, []).append(run)
+
+    def load(runs):
+        for run in runs:
+            yield (run["id"], *load_trace(run["id"], request.channel), run_criteria(run["id"], request.plan_id, run))
+
+    results = [check_batch(standard, load(runs)) for standard, runs in groups.items()]
+    return {
+        "checked": sum(r["checked"] for r in results),
+        "passed": sum(r["passed"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "results": results,
+        "skipped": skipped,
+    }
+
+@app.get("/api/traces/{test_id}")
+def trace_info(test_id: str):
+    try:
+        channels = traces.channels(test_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not channels:
+        raise HTTPException(status_code=404, detail=f"No trace recorded for test {test_id}")
+    info = {}
+    for channel in channels:
+        header, records = map_trace(traces.path(test_id, channel))
+        duration = float(records["t"][-1] - records["t"][0]) / NS if len(records) else 0.0
+        info[str(channel)] = {"t0": header["t0"], "samples": len(records), "duration": duration}
+    return {"test_id": test_id, "channels": info}
+
+@app.get("/api/traces/{test_id}/{channel}")
+def read_trace(test_id: str, channel: int, start: Optional[float] = None, end: Optional[float] = None,
+               format: str = "binary"):
+    """Slice of a recorded trace; start/end are seconds since the first sample."""
+    header, records = map_trace(trace_path(test_id, channel))
+    t0 = header["t0"]
+    lo, hi = time_slice(records, None if start is None else t0 + start, None if end is None else t0 + end)
+    if format == "binary":
+        return Response(
+            content=records[lo:hi].tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Trace-Samples": str(hi - lo), "X-Trace-Dtype": "<i8 t_ns, <f4 pressure", "X-Trace-T0": repr(t0)},
+        )
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be binary or json")
+    if hi - lo > MAX_JSON_SAMPLES:
+        raise HTTPException(status_code=413, detail=f"Slice has {hi - lo} samples; request a narrower window or format=binary")
+    window = records[lo:hi]
+    return {
+        "test_id": test_id,
+        "channel": channel,
+        "t0": t0,
+        "timestamps": ((window["t"] - int(round(t0 * NS))) / NS).tolist(),
+        "pressure": window["p"].tolist(),
+    }
+
+@app.get("/api/traces/{test_id}/{channel}/downsampled")
+def read_trace_downsampled(test_id: str, channel: int, width: int = 1280, start: Optional[float] = None,
+                           end: Optional[float] = None, method: str = "minmax"):
+    """At most ~2 points per pixel (minmax) or ``width`` points (lttb) for a chart window."""
+    if method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(METHODS)}")
+    if not 2 <= width <= 10000:
+        raise HTTPException(status_code=400, detail="width must be between 2 and 10000")
+    header, records = map_trace(trace_path(test_id, channel))
+
+    def load():
+        return (records["t"] - int(round(header["t0"] * NS))) / NS, records["p"]
+
+    pyramid = pyramids.get((test_id, channel), len(records), load)
+    t, p = pyramid.query(width, start, end, method)
+    return {
+        "test_id": test_id,
+        "channel": channel,
+        "method": method,
+        "samples": pyramid.count,
+        "timestamps": t.tolist(),
+        "pressure": p.tolist(),
+    }
+
+@app.post("/api/plans/compile")
+async def compile_plan(request: PlanRequest):
+    try:
+        plan, cached = plans.compile(request.source, request.data, request.overrides)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"cached": cached, **plan.to_dict()}
+
+@app.get("/api/plans")
+async def plan_cache_stats():
+    return plans.stats()
+
+@app.get("/api/plans/{plan_id}")
+async def read_plan(plan_id: str):
+    return get_plan(plan_id).to_dict()
+
+@app.post("/api/sessions")
+async def start_session(request: SessionRequest):
+    plan = get_plan(request.plan_id)
+    try:
+        check_id(request.test_id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        session = scheduler.start(request.test_id, plan, request.channel, request.operator, request.name)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.to_dict()
+
+@app.get("/api/sessions")
+async def list_sessions(state: Optional[str] = None):
+    sessions = scheduler.list(state)
+    return {"active": scheduler.active_count(), "sessions": [s.to_dict() for s in sessions]}
+
+@app.get("/api/sessions/{test_id}")
+async def read_session(test_id: str):
+    session = scheduler.get(test_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No session for test {test_id}")
+    return session.to_dict()
+
+@app.delete("/api/sessions/{test_id}")
+async def cancel_session(test_id: str):
+    if not scheduler.cancel(test_id):
+        raise HTTPException(status_code=404, detail=f"No running session for test {test_id}")
+    return {"test_id": test_id, "cancelled": True}
+
+@app.put("/api/stands/{stand_id}")
+async def configure_stand(stand_id: str, request: StandRequest):
+    allocator.set_channels(stand_id, request.channels)
+    start_allocated()
+    return {"stand_id": stand_id, "channels": allocator.stands().get(stand_id, [])}
+
+@app.get("/api/stands")
+async def list_stands():
+    return {**allocator.stats(), "stands": allocator.stands()}
+
+@app.post("/api/queue")
+async def enqueue_test(request: QueueRequest):
+    """Queue a run; it starts as a session as soon as the allocator gives it a free channel."""
+    plan = get_plan(request.plan_id)
+    try:
+        check_id(request.test_id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    session = scheduler.get(request.test_id)
+    if session is not None and session.active:
+        raise HTTPException(status_code=409, detail=f"Test {request.test_id} is already running")
+    try:
+        entry = allocator.enqueue(request.test_id, plan, request.operator, request.priority, request.name)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    start_allocated()
+    return queue_view(entry, allocator.waits())
+
+@app.get("/api/queue")
+async def list_queue():
+    waits = allocator.waits()
+    entries = sorted(allocator.entries.values(), key=lambda e: (e.state != "running", waits.get(e.test_id, (0,))[0]))
+    return {**allocator.stats(), "entries": [queue_view(entry, waits) for entry in entries]}
+
+@app.get("/api/queue/{test_id}")
+async def read_queue_entry(test_id: str):
+    entry = allocator.get(test_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Test {test_id} is not queued")
+    return queue_view(entry, allocator.waits())
+
+@app.delete("/api/queue/{test_id}")
+async def dequeue_test(test_id: str):
+    if not allocator.remove(test_id):
+        raise HTTPException(status_code=404, detail=f"Test {test_id} is not waiting in the queue")
+    return {"test_id": test_id, "removed": True}
+
+@app.post("/api/history")
+def record_run(run: TestRun):
+    try:
+        history.record(run.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return history.get(run.id)
+
+@app.get("/api/history")
+def list_history(
+    device_type: Optional[str] = None,
+    status: Optional[str] = None,
+    operator: Optional[str] = None,
+    result: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+):
+    filters = {"device_type": device_type, "status": status, "operator": operator, "result": result}
+    try:
+        return history.page(filters, date_from, date_to, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/history/export")
+def export_history(
+    format: str = "json",
+    device_type: Optional[str] = None,
+    status: Optional[str] = None,
+    operator: Optional[str] = None,
+    result: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    user: Optional[str] = None,
+):
+    """Stream matching runs page by page; memory stays flat whatever the export size."""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    filters = {"device_type": device_type, "status": status, "operator": operator, "result": result}
+    try:
+        history.validate_filters(filters, date_from, date_to)  # before streaming starts
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = FORMATS[format]
+    filename = f"test-data-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{extension}"
+    return StreamingResponse(
+        stream(format, history.iterate(filters, date_from, date_to), user),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/api/history/{run_id}")
+def get_run(run_id: str):
+    run = history.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Test run {run_id} not found")
+    return run
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8203)
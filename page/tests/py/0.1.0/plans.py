@@ -0,0 +1,193 @@
+"""
+Compilation of wizard data, templates and scenarios into immutable test plans
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+from evaluation import Criteria
+
+SOURCES = ("wizard", "template", "scenario")
+MIN_DURATION = 60  # same lower bound as the wizard's step 3 validation
+MIN_CYCLE_LENGTH = 1.0
+
+# Share of each cycle spent in a phase; pressurize and hold target the setpoint, release returns to 0.
+# Only the hold phase is evaluated against the tolerance band.
+PHASES = (("pressurize", 0.2), ("hold", 0.6), ("release", 0.2))
+HOLD = (0.2, 0.8)
+
+
+def normalise_spec(source, data, overrides=None):
+    """Map any of the three frontend shapes onto one flat, execution-relevant spec."""
+    if source not in SOURCES:
+        raise ValueError(f"Unknown plan source: {source}")
+    data = data or {}
+    if source == "wizard":
+        device, test, params = data.get("step1") or {}, data.get("step2") or {}, data.get("step3") or {}
+    elif source == "template":
+        device, test, params = data.get("device") or {}, data.get("test") or {}, data.get("parameters") or {}
+    else:
+        device = {"deviceType": data.get("device")} if isinstance(data.get("device"), str) else data.get("device") or {}
+        test = {"testType": data.get("testType"), "testStandard": data.get("testStandard")}
+        params = data.get("parameters") or {}
+
+    spec = {
+        "device_type": device.get("deviceType"),
+        "device_model": device.get("deviceModel"),
+        "test_type": test.get("testType"),
+        "test_standard": test.get("testStandard"),
+        "pressure_range": test.get("pressureRange", params.get("pressureRange")),
+        "duration": params.get("duration", 300),
+        "cycles": params.get("cycles", 1),
+        "tolerance": params.get("tolerance", 5),
+        "alerts": bool(params.get("alerts", True)),
+    }
+    for key, value in (overrides or {}).items():
+        key = {"pressureRange": "pressure_range"}.get(key, key)
+        if key not in spec:
+            raise ValueError(f"Unknown plan override: {key}")
+        spec[key] = value
+    return spec
+
+
+def content_hash(spec):
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    cycle: int
+    phase: str
+    start: float
+    end: float
+    setpoint: float
+
+
+@dataclass(frozen=True)
+class TestPlan:
+    plan_id: str
+    device_type: str
+    device_model: str
+    test_type: str
+    test_standard: str
+    criteria: Criteria
+    setpoint: float
+    alerts: bool
+    timeout: float
+    schedule: tuple
+
+    def to_dict(self):
+        low, high = self.criteria.band
+        return {
+            "plan_id": self.plan_id,
+            "device_type": self.device_type,
+            "device_model": self.device_model,
+            "test_type": self.test_type,
+            "test_standard": self.test_standard,
+            "pressure_range": {"min": self.criteria.min_pressure, "max": self.criteria.max_pressure},
+            "thresholds": {"min": low, "max": high},
+            "setpoint": self.setpoint,
+            "duration": self.criteria.duration,
+            "cycles": self.criteria.cycles,
+            "cycle_length": self.criteria.cycle_length,
+            "tolerance": self.criteria.tolerance,
+            "alerts": self.alerts,
+            "timeout": self.timeout,
+            "schedule": [step.__dict__ for step in self.schedule],
+        }
+
+
+def plan_spec(plan):
+    """Normalised spec that rebuilds ``plan``, e.g. from a session checkpoint after a restart."""
+    return {
+        "device_type": plan.device_type,
+        "device_model": plan.device_model,
+        "test_type": plan.test_type,
+        "test_standard": plan.test_standard,
+        "pressure_range": [plan.criteria.min_pressure, plan.criteria.max_pressure],
+        "duration": plan.criteria.duration,
+        "cycles": plan.criteria.cycles,
+        "tolerance": plan.criteria.tolerance,
+        "alerts": plan.alerts,
+    }
+
+
+def build_plan(plan_id, spec):
+    if spec["pressure_range"] is None:
+        raise ValueError("pressureRange is required to compile a plan")
+    criteria = Criteria.from_parameters(spec["pressure_range"], spec["duration"], spec["cycles"], spec["tolerance"])
+    criteria = replace(criteria, hold=HOLD)
+    if criteria.duration < MIN_DURATION:
+        raise ValueError(f"duration must be at least {MIN_DURATION}s")
+    if criteria.cycle_length < MIN_CYCLE_LENGTH:
+        raise ValueError(f"cycles must last at least {MIN_CYCLE_LENGTH}s each")
+
+    setpoint = (criteria.min_pressure + criteria.max_pressure) / 2.0
+    schedule = []
+    for cycle in range(criteria.cycles):
+        start = cycle * criteria.cycle_length
+        for phase, share in PHASES:
+            end = start + share * criteria.cycle_length
+            schedule.append(PlanStep(cycle + 1, phase, start, end, 0.0 if phase == "release" else setpoint))
+            start = end
+
+    return TestPlan(
+        plan_id=plan_id,
+        device_type=spec["device_type"],
+        device_model=spec["device_model"],
+        test_type=spec["test_type"],
+        test_standard=spec["test_standard"],
+        criteria=criteria,
+        setpoint=setpoint,
+        alerts=spec["alerts"],
+        timeout=criteria.duration + max(30.0, 0.1 * criteria.duration),
+        schedule=tuple(schedule),
+    )
+
+
+class PlanCache:
+    """LRU of compiled plans keyed by the content hash of their normalised spec."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source, data, overrides=None):
+        """Return (plan, cached) for the given frontend payload."""
+        spec = normalise_spec(source, data, overrides)
+        plan_id = content_hash(spec)
+        plan = self.plans.get(plan_id)
+        if plan is not None:
+            self.plans.move_to_end(plan_id)
+            self.hits += 1
+            return plan, True
+
+        plan = build_plan(plan_id, spec)
+        self.misses += 1
+        self.plans[plan_id] = plan
+        if len(self.plans) > self.maxsize:
+            self.plans.popitem(last=False)
+        return plan, False
+
+    def restore(self, plan_id, spec):
+        """Rebuild a plan under its original id, e.g. one referenced by a checkpoint."""
+        plan = self.plans.get(plan_id)
+        if plan is None:
+            plan = self.plans[plan_id] = build_plan(plan_id, spec)
+            if len(self.plans) > self.maxsize:
+                self.plans.popitem(last=False)
+        return plan
+
+    def get(self, plan_id):
+        plan = self.plans.get(plan_id)
+        if plan is not None:
+            self.plans.move_to_end(plan_id)
+        return plan
+
+    def stats(self):
+        return {"size": len(self.plans), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
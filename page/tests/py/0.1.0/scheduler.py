@@ -0,0 +1,284 @@
+"""
+Asyncio scheduler driving concurrent test sessions through their plan schedules
+"""
+
+import asyncio
+import time
+
+ACTIVE_STATES = ("pending", "running")
+MAX_FINISHED = 1000  # finished sessions kept for inspection
+PREPARE_POLL = 0.05  # seconds between checks for the stand's first samples
+RESUME_WINDOW = 30.0  # longest outage after which a checkpointed session is resumed instead of aborted
+
+
+class SessionFailed(Exception):
+    pass
+
+
+class Session:
+    """One test run following a compiled plan on one stand channel."""
+
+    def __init__(self, test_id, plan, channel=0, operator=None, name=None):
+        self.test_id = test_id
+        self.plan = plan
+        self.channel = channel
+        self.operator = operator
+        self.name = name or test_id
+        self.state = "pending"
+        self.cycle = 0
+        self.phase = None
+        self.created = time.time()
+        self.started = None
+        self.origin = None  # wall-clock start of the plan schedule, set once the stand streams
+        self.finished = None
+        self.reason = None
+        self.alerts = []
+        self.result = None
+        self.task = None
+        self.last_total = 0
+        self.last_sample_at = None
+        self.out_of_band = False
+
+    def alert(self, kind, message):
+        self.alerts.append({
+            "time": time.time(),
+            "cycle": self.cycle,
+            "phase": self.phase,
+            "type": kind,
+            "message": message,
+        })
+
+    def checkpoint(self):
+        """State needed to resume the session; samples live in its trace file."""
+        return {
+            "test_id": self.test_id,
+            "name": self.name,
+            "plan_id": self.plan.plan_id,
+            "channel": self.channel,
+            "operator": self.operator,
+            "state": self.state,
+            "cycle": self.cycle,
+            "phase": self.phase,
+            "created": self.created,
+            "started": self.started,
+            "origin": self.origin,
+            "alerts": self.alerts,
+            "saved": time.time(),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, state, plan):
+        session = cls(state["test_id"], plan, state["channel"], state["operator"], state["name"])
+        for key in ("state", "cycle", "phase", "created", "started", "origin", "alerts"):
+            setattr(session, key, state[key])
+        return session
+
+    @property
+    def active(self):
+        return self.state in ACTIVE_STATES
+
+    def to_dict(self):
+        return {
+            "test_id": self.test_id,
+            "name": self.name,
+            "plan_id": self.plan.plan_id,
+            "channel": self.channel,
+            "operator": self.operator,
+            "state": self.state,
+            "cycle": self.cycle,
+            "cycles": self.plan.criteria.cycles,
+            "phase": self.phase,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed": None if self.started is None else (self.finished or time.time()) - self.started,
+            "reason": self.reason,
+            "alerts": self.alerts,
+            "result": self.result,
+        }
+
+
+class SessionScheduler:
+    """Runs every session as a coroutine on the event loop; no thread per test.
+
+    Each cycle of a session is a state machine: prepare, pressurize, hold, release. The first
+    prepare waits for the stand to stream and anchors the plan schedule; later ones mark the
+    cycle boundary. While a phase lasts the session wakes every ``tick`` seconds to watch the live
+    sample buffer: no new samples for ``stall_timeout`` seconds fails the session, and when the
+    plan has alerts enabled, hold-phase pressure leaving the tolerance band raises an alert.
+    The whole run is bounded by the plan's timeout. ``on_checkpoint(session)`` is called at every
+    prepare and when shutdown interrupts the session; ``on_finish(session)`` once the session
+    reaches a final state.
+    """
+
+    def __init__(self, samples, on_finish=None, tick=1.0, stall_timeout=10.0, max_sessions=1000,
+                 on_checkpoint=None, resume_window=RESUME_WINDOW):
+        self.samples = samples
+        self.on_finish = on_finish
+        self.on_checkpoint = on_checkpoint
+        self.tick = tick
+        self.stall_timeout = stall_timeout
+        self.max_sessions = max_sessions
+        self.resume_window = resume_window
+        self.sessions = {}
+        self.closing = False
+
+    def active_count(self):
+        return sum(1 for session in self.sessions.values() if session.active)
+
+    def start(self, test_id, plan, channel=0, operator=None, name=None):
+        existing = self.sessions.get(test_id)
+        if existing is not None and existing.active:
+            raise ValueError(f"Test {test_id} is already running")
+        if self.active_count() >= self.max_sessions:
+            raise ValueError(f"Scheduler is at its limit of {self.max_sessions} sessions")
+        session = Session(test_id, plan, channel, operator, name)
+        self.sessions[test_id] = session
+        session.task = asyncio.get_running_loop().create_task(self._run(session))
+        self._prune()
+        return session
+
+    def resume(self, state, plan, last_seen=None):
+        """Adopt a checkpointed session after a restart, or abort it when it cannot continue.
+
+        ``last_seen`` is when the session was last known to be alive (e.g. its newest sample);
+        outages longer than ``resume_window`` or past the end of the schedule abort the run.
+        """
+        session = Session.from_checkpoint(state, plan)
+        self.sessions[session.test_id] = session
+        now = time.time()
+        gap = now - max(state["saved"], last_seen or 0.0)
+        if gap > self.resume_window:
+            reason = f"backend was unavailable for {gap:.0f}s in cycle {session.cycle}"
+        elif session.origin is not None and now - session.origin >= plan.criteria.duration:
+            reason = "schedule ended while the backend was unavailable"
+        else:
+            session.last_sample_at = now
+            session.alert("resumed", f"resumed in cycle {session.cycle} after {gap:.1f}s")
+            session.task = asyncio.get_running_loop().create_task(self._run(session))
+            return session
+        session.state = "aborted"
+        session.reason = reason
+        session.alert("aborted", reason)
+        session.finished = now
+        session.phase = None
+        if self.on_finish is not None:
+            self.on_finish(session)
+        return session
+
+    def cancel(self, test_id):
+        session = self.sessions.get(test_id)
+        if session is None or not session.active:
+            return False
+        session.task.cancel()
+        return True
+
+    def get(self, test_id):
+        return self.sessions.get(test_id)
+
+    def list(self, state=None):
+        return [s for s in self.sessions.values() if state is None or s.state == state]
+
+    async def shutdown(self):
+        """Stop every session; checkpointed ones are left to be resumed by the next process."""
+        self.closing = True
+        tasks = [s.task for s in self.sessions.values() if s.active]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune(self):
+        finished = [s for s in self.sessions.values() if not s.active]
+        for session in sorted(finished, key=lambda s: s.finished)[:max(0, len(finished) - MAX_FINISHED)]:
+            del self.sessions[session.test_id]
+
+    async def _run(self, session):
+        remaining = session.plan.timeout - (time.time() - session.started if session.started else 0.0)
+        try:
+            await asyncio.wait_for(self._drive(session), timeout=max(remaining, 0.0))
+            session.state = "completed"
+        except asyncio.TimeoutError:
+            session.state = "timeout"
+            session.reason = f"exceeded plan timeout of {session.plan.timeout:.0f}s"
+            session.alert("timeout", session.reason)
+        except SessionFailed as e:
+            session.state = "failed"
+            session.reason = str(e)
+            session.alert("failed", session.reason)
+        except asyncio.CancelledError:
+            if self.closing and self.on_checkpoint is not None:
+                session.state = "interrupted"
+                self._checkpoint(session)
+            else:
+                session.state = "cancelled"
+                session.reason = "cancelled"
+        finally:
+            if session.state != "interrupted":
+                session.finished = time.time()
+                session.phase = None
+                if self.on_finish is not None:
+                    self.on_finish(session)
+
+    async def _drive(self, session):
+        loop = asyncio.get_running_loop()
+        session.state = "running"
+        if session.origin is None:
+            if session.started is None:
+                session.started = session.last_sample_at = time.time()
+            session.cycle, session.phase = 1, "prepare"
+            await self._prepare(session)
+            session.origin = time.time()
+            self._checkpoint(session)
+        origin = loop.time() - (time.time() - session.origin)
+        for step in session.plan.schedule:
+            end = origin + step.end
+            if end <= loop.time():
+                continue  # already behind a resumed session
+            if step.cycle != session.cycle:
+                session.cycle, session.phase = step.cycle, "prepare"
+                self._checkpoint(session)
+            session.phase = step.phase
+            while (remaining := end - loop.time()) > 0:
+                await asyncio.sleep(min(self.tick, remaining))
+                self._watch(session, step)
+
+    async def _prepare(self, session):
+        """Wait for the stand's first samples on the session channel."""
+        while True:
+            buffer = self.samples.get(session.test_id)
+            channel = buffer.channels.get(session.channel) if buffer is not None else None
+            if channel is not None and channel.total:
+                session.last_total = channel.total
+                session.last_sample_at = time.time()
+                return
+            if time.time() - session.last_sample_at > self.stall_timeout:
+                raise SessionFailed(f"stand sent no samples within {self.stall_timeout:g}s")
+            await asyncio.sleep(PREPARE_POLL)
+
+    def _checkpoint(self, session):
+        if self.on_checkpoint is None:
+            return
+        try:
+            self.on_checkpoint(session)
+        except (OSError, ValueError) as e:
+            session.alert("checkpoint", f"checkpoint failed: {e}")
+
+    def _watch(self, session, step):
+        buffer = self.samples.get(session.test_id)
+        channel = buffer.channels.get(session.channel) if buffer is not None else None
+        now = time.time()
+        if channel is not None and channel.total != session.last_total:
+            session.last_total = channel.total
+            session.last_sample_at = now
+        if now - session.last_sample_at > self.stall_timeout:
+            raise SessionFailed(f"no samples for {self.stall_timeout:g}s")
+
+        if not session.plan.alerts or channel is None or step.phase != "hold":
+            session.out_of_band = False
+            return
+        low, high = session.plan.criteria.band
+        latest = float(channel.pressure[(channel.head - 1) % channel.capacity])
+        outside = latest < low or latest > high
+        if outside and not session.out_of_band:
+            session.alert("out_of_band", f"pressure {latest:.2f} outside {low:.2f}..{high:.2f}")
+        session.out_of_band = outside
@@ -0,0 +1,336 @@
+"""
+Compliance checks against per-standard stand procedure limits, compiled into vectorized checks over hold-phase metrics
+"""
+
+import json
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+
+from evaluation import Criteria
+from plans import HOLD
+
+# Per (run, cycle) hold-phase metrics; pressures in mbar, leak rate in mbar/min
+METRICS = ("hold_min", "hold_max", "hold_mean", "hold_drop", "leak_rate", "hold_time")
+
+# Built-in placeholder stand procedure limits for each standard listed in devices.js. They are NOT
+# the acceptance criteria of the standards themselves: a site sets the limits of its own validated
+# test procedure in a limits file (see load_limits). Every rule bounds one metric with either "min"
+# or "max" and must hold in every cycle of the run; "procedure" is the cycle layout used when a run
+# has no compiled plan of its own.
+DEFAULT_LIMITS = {
+    "EN 149:2001+A1:2009": {
+        "device_types": ("PP_MASK",),
+        "procedure": {"pressure_range": (9.0, 11.0), "duration": 300, "cycles": 1},
+        "rules": (
+            {"id": "hold_pressure_low", "metric": "hold_min", "min": 9.0},
+            {"id": "hold_pressure_high", "metric": "hold_max", "max": 11.0},
+            {"id": "leak_rate", "metric": "leak_rate", "max": 0.5},
+            {"id": "pressure_drop", "metric": "hold_drop", "max": 1.0},
+            {"id": "hold_time", "metric": "hold_time", "min": 60.0},
+        ),
+    },
+    "EN 14387:2004": {
+        "device_types": ("NP_MASK",),
+        "procedure": {"pressure_range": (9.0, 11.0), "duration": 300, "cycles": 1},
+        "rules": (
+            {"id": "hold_pressure_low", "metric": "hold_min", "min": 9.0},
+            {"id": "hold_pressure_high", "metric": "hold_max", "max": 11.0},
+            {"id": "leak_rate", "metric": "leak_rate", "max": 0.5},
+            {"id": "pressure_drop", "metric": "hold_drop", "max": 1.0},
+            {"id": "hold_time", "metric": "hold_time", "min": 60.0},
+        ),
+    },
+    "EN 137:2006": {
+        "device_types": ("SCBA",),
+        "procedure": {"pressure_range": (23.0, 27.0), "duration": 300, "cycles": 1},
+        "rules": (
+            {"id": "hold_pressure_low", "metric": "hold_min", "min": 23.0},
+            {"id": "hold_pressure_high", "metric": "hold_max", "max": 27.0},
+            {"id": "leak_rate", "metric": "leak_rate", "max": 1.0},
+            {"id": "hold_time", "metric": "hold_time", "min": 60.0},
+        ),
+    },
+    "EN 14605:2005": {
+        "device_types": ("CPS",),
+        "procedure": {"pressure_range": (15.0, 19.0), "duration": 600, "cycles": 1},
+        "rules": (
+            {"id": "hold_pressure_low", "metric": "hold_min", "min": 15.0},
+            {"id": "hold_pressure_high", "metric": "hold_max", "max": 19.0},
+            {"id": "pressure_drop", "metric": "hold_drop", "max": 3.0},  # EN 464 gas-tightness
+            {"id": "leak_rate", "metric": "leak_rate", "max": 0.5},
+            {"id": "hold_time", "metric": "hold_time", "min": 300.0},
+        ),
+    },
+}
+
+BUILT_IN = "built-in placeholder procedure limits"
+STANDARDS = dict(DEFAULT_LIMITS)
+LIMITS_SOURCE = BUILT_IN
+
+BATCH_SAMPLES = 4_000_000  # samples concatenated per vectorized pass of a batch check
+
+
+def resolve(name=None, device_type=None):
+    """Full standard name for "EN 149", "EN 149:2001+A1:2009" or, failing that, a device type."""
+    if name:
+        key = name.strip().upper()
+        for standard in STANDARDS:
+            if standard.upper() == key or standard.split(":")[0].upper() == key:
+                return standard
+        raise ValueError(f"Unknown standard: {name}")
+    for standard, spec in STANDARDS.items():
+        if device_type in spec["device_types"]:
+            return standard
+    raise ValueError(f"No standard covers device type {device_type}")
+
+
+def hold_metrics(runs):
+    """Metrics of every (run, cycle) hold phase for ``runs`` = [(t, p, criteria), ...].
+
+    All traces are concatenated and labelled with a run*cycles+cycle group id, so the whole batch
+    takes a fixed number of array passes. Returns ``(values, applicable)``: ``values`` has shape
+    (len(METRICS), runs, max cycles) with NaN where a cycle has no hold samples, ``applicable``
+    marks the cycles each run actually has.
+    """
+    n_runs = len(runs)
+    lengths = np.fromiter((len(p) for _, p, _ in runs), dtype=np.int64, count=n_runs)
+    cycles = np.fromiter((c.cycles for _, _, c in runs), dtype=np.int64, count=n_runs)
+    width = int(cycles.max()) if n_runs else 1
+    values = np.full((len(METRICS), n_runs, width), np.nan)
+    applicable = np.arange(width) < cycles[:, None]
+    if not lengths.sum():
+        return values, applicable
+
+    nonempty = [run for run in runs if len(run[1])]
+    t = np.concatenate([np.asarray(t, dtype=np.float64) - float(t[0]) for t, _, _ in nonempty])
+    p = np.concatenate([np.asarray(p, dtype=np.float64) for _, p, _ in nonempty])
+    run = np.repeat(np.arange(n_runs), lengths)
+    cycle_length = np.array([c.cycle_length for _, _, c in runs])[run]
+    hold_lo = np.array([c.hold[0] for _, _, c in runs])[run]
+    hold_hi = np.array([c.hold[1] for _, _, c in runs])[run]
+
+    cycle = np.minimum((t // cycle_length).astype(np.int64), cycles[run] - 1)
+    position = (t - cycle * cycle_length) / cycle_length  # exact at phase boundaries, unlike t / length - cycle
+    held = (position >= hold_lo) & (position < hold_hi)
+    t, p, group = t[held], p[held], (run * width + cycle)[held]
+    if not t.size:
+        return values, applicable
+
+    n_groups = n_runs * width
+    counts = np.bincount(group, minlength=n_groups)
+    present = counts > 0
+    starts = np.searchsorted(group, np.arange(n_groups))
+    ends = starts + counts
+    x = t - t[starts[group]]  # seconds since the group's first hold sample, keeps the sums well conditioned
+
+    n = counts.astype(np.float64)
+    sx = np.bincount(group, weights=x, minlength=n_groups)
+    sy = np.bincount(group, weights=p, minlength=n_groups)
+    sxx = np.bincount(group, weights=x * x, minlength=n_groups)
+    sxy = np.bincount(group, weights=x * p, minlength=n_groups)
+
+    flat = values.reshape(len(METRICS), n_groups)
+    first = starts[present]
+    last = ends[present] - 1
+    flat[0, present] = np.minimum.reduceat(p, first)
+    flat[1, present] = np.maximum.reduceat(p, first)
+    flat[2, present] = sy[present] / n[present]
+    flat[3, present] = p[first] - p[last]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denominator = n * sxx - sx * sx
+        slope = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, 0.0)
+    flat[4, present] = -slope[present] * 60.0
+    # n samples cover n sample intervals: the first-to-last span plus the mean interval, to the microsecond
+    count = n[present]
+    flat[5, present] = np.round(np.where(count > 1, x[last] * count / np.maximum(count - 1, 1), 0.0), 6)
+    return values, applicable
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """One standard's rules compiled into aligned arrays: metric row, lower and upper limit."""
+
+    standard: str
+    ids: tuple
+    metric: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+    procedure: Criteria
+
+    @classmethod
+    def compile(cls, standard):
+        spec = STANDARDS[standard]
+        rules = spec["rules"]
+        for rule in rules:
+            if rule["metric"] not in METRICS or ("min" in rule) == ("max" in rule):
+                raise ValueError(f"{standard}: rule {rule['id']} needs a known metric and one of min/max")
+        procedure = spec["procedure"]
+        return cls(
+            standard=standard,
+            ids=tuple(rule["id"] for rule in rules),
+            metric=np.array([METRICS.index(rule["metric"]) for rule in rules]),
+            low=np.array([rule.get("min", -np.inf) for rule in rules], dtype=np.float64),
+            high=np.array([rule.get("max", np.inf) for rule in rules], dtype=np.float64),
+            procedure=Criteria(*procedure["pressure_range"], float(procedure["duration"]), procedure["cycles"], 0.0, HOLD),
+        )
+
+    def apply(self, values, applicable):
+        """Rule x run x cycle pass matrix; cycles a run does not have always pass."""
+        checked = values[self.metric]
+        with np.errstate(invalid="ignore"):
+            ok = (checked >= self.low[:, None, None]) & (checked <= self.high[:, None, None])
+        return ok | ~applicable[None]
+
+    def worst(self, values, applicable):
+        """Per rule and run, the value closest to (or furthest past) the rule's limit."""
+        checked = np.where(applicable[None], values[self.metric], np.nan)
+        upper = np.isfinite(self.high)[:, None]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows: runs without hold samples
+            return np.where(upper, np.nanmax(checked, axis=2), np.nanmin(checked, axis=2))
+
+    def check(self, runs):
+        """Check ``runs`` = [(t, p, criteria or None), ...]; None falls back to the standard's procedure."""
+        runs = [(t, p, criteria or self.procedure) for t, p, criteria in runs]
+        values, applicable = hold_metrics(runs)
+        ok = self.apply(values, applicable)
+        rule_passed = ok.all(axis=2)
+        return values, applicable, ok, rule_passed, self.worst(values, applicable)
+
+    def limit(self, i):
+        return {"min": float(self.low[i])} if np.isfinite(self.low[i]) else {"max": float(self.high[i])}
+
+    def describe(self):
+        return {
+            "standard": self.standard,
+            "limits": "stand procedure",
+            "limits_source": LIMITS_SOURCE,
+            "device_types": list(STANDARDS[self.standard]["device_types"]),
+            "procedure": {
+                "pressure_range": [self.procedure.min_pressure, self.procedure.max_pressure],
+                "duration": self.procedure.duration,
+                "cycles": self.procedure.cycles,
+                "hold": list(self.procedure.hold),
+            },
+            "rules": [
+                {"id": rule_id, "metric": METRICS[self.metric[i]], **self.limit(i)}
+                for i, rule_id in enumerate(self.ids)
+            ],
+        }
+
+
+RULESETS = {standard: RuleSet.compile(standard) for standard in STANDARDS}
+
+
+def load_limits(path):
+    """Replace or add standards from the JSON file at ``path``, shaped like DEFAULT_LIMITS.
+
+    Every rule is compiled before anything is swapped in, so a bad file leaves the current limits
+    in place and raises ValueError.
+    """
+    global LIMITS_SOURCE
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Cannot read limits file {path}: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected an object of standards")
+    limits = dict(DEFAULT_LIMITS)
+    for standard, spec in data.items():
+        try:
+            limits[standard] = {
+                "device_types": tuple(spec["device_types"]),
+                "procedure": {**spec["procedure"], "pressure_range": tuple(spec["procedure"]["pressure_range"])},
+                "rules": tuple(spec["rules"]),
+            }
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{path}: {standard} needs device_types, procedure and rules ({e})") from e
+    previous = dict(STANDARDS)
+    STANDARDS.clear()
+    STANDARDS.update(limits)
+    try:
+        rulesets = {standard: RuleSet.compile(standard) for standard in STANDARDS}
+    except (KeyError, TypeError, ValueError) as e:
+        STANDARDS.clear()
+        STANDARDS.update(previous)
+        raise ValueError(f"{path}: {e}") from e
+    RULESETS.clear()
+    RULESETS.update(rulesets)
+    LIMITS_SOURCE = path
+
+
+def _value(v):
+    return None if np.isnan(v) else float(v)
+
+
+def check_trace(standard, t, p, criteria=None):
+    """Full compliance report of one trace, including per-cycle metrics."""
+    ruleset = RULESETS[standard]
+    values, applicable, ok, rule_passed, worst = ruleset.check([(t, p, criteria)])
+    n_cycles = int(applicable[0].sum())
+    rules = [
+        {
+            "id": rule_id,
+            "metric": METRICS[ruleset.metric[i]],
+            **ruleset.limit(i),
+            "value": _value(worst[i, 0]),
+            "passed": bool(rule_passed[i, 0]),
+            "failed_cycles": (np.flatnonzero(~ok[i, 0, :n_cycles]) + 1).tolist(),
+        }
+        for i, rule_id in enumerate(ruleset.ids)
+    ]
+    passed = bool(rule_passed[:, 0].all())
+    return {
+        "standard": standard,
+        "limits_source": LIMITS_SOURCE,
+        "passed": passed,
+        "result": "PASS" if passed else "FAIL",
+        "samples": int(len(p)),
+        "rules": rules,
+        "cycles": [
+            {"cycle": c + 1, **{metric: _value(values[m, 0, c]) for m, metric in enumerate(METRICS)}}
+            for c in range(n_cycles)
+        ],
+    }
+
+
+def check_batch(standard, runs):
+    """Compact pass/fail per run for ``runs`` = [(run_id, t, p, criteria or None), ...].
+
+    Runs are checked in chunks of about BATCH_SAMPLES concatenated samples, each chunk in one
+    vectorized pass; a failed run lists the ids of the rules it broke.
+    """
+    ruleset = RULESETS[standard]
+    results = []
+    failures = np.zeros(len(ruleset.ids), dtype=np.int64)
+
+    def flush(chunk):
+        if not chunk:
+            return
+        _, _, _, rule_passed, _ = ruleset.check([(t, p, criteria) for _, t, p, criteria in chunk])
+        failures[:] += (~rule_passed).sum(axis=1)
+        for j, (run_id, _, p, _) in enumerate(chunk):
+            failed = [ruleset.ids[i] for i in np.flatnonzero(~rule_passed[:, j])]
+            results.append({"id": run_id, "samples": int(len(p)), "passed": not failed, "failed_rules": failed})
+
+    chunk, size = [], 0
+    for run in runs:
+        chunk.append(run)
+        size += len(run[2])
+        if size >= BATCH_SAMPLES:
+            flush(chunk)
+            chunk, size = [], 0
+    flush(chunk)
+    passed = sum(result["passed"] for result in results)
+    return {
+        "standard": standard,
+        "limits_source": LIMITS_SOURCE,
+        "checked": len(results),
+        "passed": passed,
+        "failed": len(results) - passed,
+        "rule_failures": dict(zip(ruleset.ids, failures.tolist())),
+        "runs": results,
+    }
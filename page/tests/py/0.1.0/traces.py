@@ -0,0 +1,168 @@
+"""
+Append-only binary trace files for raw test recordings, read back through mmap
+
+File layout (little-endian):
+    header  64 bytes   magic "MSTRACE1", version, channel, record size, t0 (ns), test id
+    records 12 bytes   int64 timestamp in nanoseconds, float32 pressure
+"""
+
+import mmap
+import os
+import re
+import struct
+from collections import OrderedDict
+
+import numpy as np
+
+MAGIC = b"MSTRACE1"
+VERSION = 1
+HEADER = struct.Struct("<8sHHHxxq40s")
+HEADER_SIZE = HEADER.size
+RECORD = np.dtype([("t", "<i8"), ("p", "<f4")])
+NS = 1_000_000_000
+MAX_CHANNEL = 0xFFFF  # the header stores the channel as uint16
+MAX_WRITERS = 256  # open trace files; the least recently appended are closed and reopened on demand
+
+_SAFE_ID = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+
+def check_id(test_id):
+    if not _SAFE_ID.fullmatch(test_id) or test_id.startswith("."):
+        raise ValueError(f"Invalid test id for a trace file: {test_id!r}")
+    return test_id
+
+
+class TraceWriter:
+    """Appends sample batches to one trace file; flushed per batch, never fsynced per sample."""
+
+    def __init__(self, path, test_id, channel, t0=0.0):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        if new:
+            self.file.write(HEADER.pack(MAGIC, VERSION, channel, RECORD.itemsize,
+                                        int(t0 * NS), test_id.encode()[:40]))
+
+    def append(self, timestamps, pressure):
+        records = np.empty(len(timestamps), dtype=RECORD)
+        records["t"] = np.round(np.asarray(timestamps, dtype=np.float64) * NS)
+        records["p"] = pressure
+        self.file.write(records.tobytes())
+        self.file.flush()
+
+    def sync(self):
+        """Force appended records to disk; called at checkpoints, not per batch."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return (self.file.tell() - HEADER_SIZE) // RECORD.itemsize
+
+    def close(self):
+        self.file.close()
+
+
+def read_header(mapped):
+    magic, version, channel, record_size, t0, test_id = HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError("Not a trace file or unsupported version")
+    return {"channel": channel, "t0": t0 / NS, "test_id": test_id.rstrip(b"\0").decode()}
+
+
+def map_trace(path):
+    """Map a trace file and return (header, records); records is a zero-copy view of the mapping.
+
+    The mapping is released when the last view of ``records`` is garbage collected.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER_SIZE:
+            raise ValueError("Trace file is truncated")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    count = (size - HEADER_SIZE) // RECORD.itemsize
+    return read_header(mapped), np.frombuffer(mapped, dtype=RECORD, count=count, offset=HEADER_SIZE)
+
+
+def repair(path):
+    """Cut a torn trailing record left by a crash so appends stay aligned; returns the record count."""
+    size = os.path.getsize(path)
+    if size < HEADER_SIZE:
+        raise ValueError("Trace file is truncated")
+    count = (size - HEADER_SIZE) // RECORD.itemsize
+    if HEADER_SIZE + count * RECORD.itemsize != size:
+        os.truncate(path, HEADER_SIZE + count * RECORD.itemsize)
+    return count
+
+
+def time_slice(records, start=None, end=None):
+    """Index range [lo, hi) of records with start <= t < end (seconds); timestamps are sorted."""
+    t = records["t"]
+    lo = 0 if start is None else int(np.searchsorted(t, int(start * NS), side="left"))
+    hi = len(records) if end is None else int(np.searchsorted(t, int(end * NS), side="left"))
+    return lo, max(lo, hi)
+
+
+class TraceStore:
+    """Trace files under ``root/<test_id>/ch<channel>.mst`` with one open writer per channel.
+
+    At most ``max_writers`` files are open at a time; the least recently appended writer is closed
+    to make room, and its file is reopened in append mode if the channel streams again.
+    """
+
+    def __init__(self, root, max_writers=MAX_WRITERS):
+        self.root = root
+        self.max_writers = max_writers
+        self.writers = OrderedDict()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, test_id, channel):
+        if not 0 <= int(channel) <= MAX_CHANNEL:
+            raise ValueError(f"Channel must be between 0 and {MAX_CHANNEL}")
+        return os.path.join(self.root, check_id(test_id), f"ch{int(channel)}.mst")
+
+    def append(self, test_id, channel, timestamps, pressure):
+        if len(timestamps) == 0:
+            return
+        key = (test_id, channel)
+        writer = self.writers.get(key)
+        if writer is None:
+            path = self.path(test_id, channel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            while len(self.writers) >= self.max_writers:
+                self.writers.popitem(last=False)[1].close()
+            writer = self.writers[key] = TraceWriter(path, test_id, channel, float(timestamps[0]))
+        else:
+            self.writers.move_to_end(key)
+        writer.append(timestamps, pressure)
+
+    def sync(self, test_id, channel):
+        """fsync the channel's trace and return its record count (0 when nothing was recorded)."""
+        writer = self.writers.get((test_id, channel))
+        if writer is not None:
+            return writer.sync()
+        path = self.path(test_id, channel)
+        if not os.path.exists(path):
+            return 0
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            return max(0, (os.fstat(fd).st_size - HEADER_SIZE) // RECORD.itemsize)
+        finally:
+            os.close(fd)
+
+    def close(self, test_id):
+        for key in [k for k in self.writers if k[0] == test_id]:
+            self.writers.pop(key).close()
+
+    def channels(self, test_id):
+        directory = os.path.join(self.root, check_id(test_id))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name[2:-4]) for name in os.listdir(directory)
+                      if name.startswith("ch") and name.endswith(".mst"))
+
+    def exists(self, test_id, channel):
+        return os.path.exists(self.path(test_id, channel))
+
+    def close_all(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
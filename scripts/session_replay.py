@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""
+MaskService Session Replay
+Replays recorded test sessions (sample batches and operator actions) against the tests backend
+at 1x, Nx or maximum speed and reports ingest throughput and latency percentiles
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+import numpy as np
+
+from stand_simulator import Colors, HttpConnection
+
+SAMPLES_PATH = re.compile(r"^/api/tests/([^/]+)/samples$")
+
+
+@dataclass
+class ReplayResult:
+    requests: int = 0
+    errors: int = 0
+    batches: int = 0
+    samples: int = 0
+    actions: int = 0
+    elapsed: float = 0.0
+    requests_per_s: float = 0.0
+    samples_per_s: float = 0.0
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    lag_ms: Dict[str, float] = field(default_factory=dict)
+
+
+def load_recording(path: str) -> Dict[str, List[dict]]:
+    """Group recorded requests by connection, keeping their order"""
+    connections: Dict[str, List[dict]] = defaultdict(list)
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                request['t'] = float(request['t'])
+                request['method'], request['path']
+            except (ValueError, KeyError) as e:
+                raise SystemExit(f"{path}:{number}: invalid recording line ({e})")
+            connections[request.get('conn', 'main')].append(request)
+    return connections
+
+
+def rename_test(request: dict, suffix: str) -> dict:
+    """Give replayed tests fresh ids so a backend that saw the original run accepts them"""
+    if not suffix:
+        return request
+    path = re.sub(r"^(/api/(?:tests|sessions|traces)/)([^/]+)", lambda m: m.group(1) + m.group(2) + suffix, request['path'])
+    body = request.get('body')
+    if isinstance(body, dict) and 'test_id' in body:
+        body = {**body, 'test_id': body['test_id'] + suffix}
+    return {**request, 'path': path, 'body': body}
+
+
+def shift_time(request: dict, offset: float) -> dict:
+    body = request.get('body')
+    if offset and isinstance(body, dict) and 't0' in body:
+        return {**request, 'body': {**body, 't0': body['t0'] + offset}}
+    return request
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    points = np.percentile(np.asarray(values) * 1000, [50, 90, 95, 99, 100])
+    return {name: round(float(v), 3) for name, v in zip(('p50', 'p90', 'p95', 'p99', 'max'), points)}
+
+
+class SessionReplay:
+    """Replays every recorded connection as its own coroutine on one event loop"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.connections = load_recording(args.recording)
+        self.latencies: List[float] = []
+        self.lags: List[float] = []
+        self.result = ReplayResult()
+        self.time_offset = 0.0
+        if args.shift_time:
+            first_t0 = min((r['body']['t0'] for reqs in self.connections.values() for r in reqs
+                            if isinstance(r.get('body'), dict) and 't0' in r['body']), default=None)
+            self.time_offset = time.time() - first_t0 if first_t0 is not None else 0.0
+
+    def print_status(self, message: str, color: str = Colors.GREEN):
+        print(f"{color}[REPLAY]{Colors.NC} {message}")
+
+    async def replay_connection(self, name: str, requests: List[dict], origin: float):
+        loop = asyncio.get_running_loop()
+        conn = HttpConnection(self.args.url, name)
+        speed = self.args.speed
+        for request in requests:
+            scheduled = origin + request['t'] / speed if speed > 0 else loop.time()
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            request = shift_time(rename_test(request, self.args.suffix), self.time_offset)
+            sent = loop.time()
+            try:
+                status, _ = await conn.request(request['method'], request['path'], request.get('body'))
+            except (OSError, asyncio.IncompleteReadError):
+                status = 0
+            done = loop.time()
+            self.result.requests += 1
+            self.latencies.append(done - sent)
+            self.lags.append(done - scheduled)
+            if not 200 <= status < 300:
+                self.result.errors += 1
+                continue
+            if SAMPLES_PATH.match(request['path']):
+                self.result.batches += 1
+                self.result.samples += len(request['body'].get('pressure', ()))
+            else:
+                self.result.actions += 1
+        await conn.close()
+
+    async def run(self) -> ReplayResult:
+        total = sum(len(reqs) for reqs in self.connections.values())
+        span = max((reqs[-1]['t'] for reqs in self.connections.values() if reqs), default=0.0)
+        speed = f"{self.args.speed:g}x" if self.args.speed > 0 else 'maximum speed'
+        self.print_status(
+            f"Replaying {total} requests on {len(self.connections)} connections "
+            f"({span:.1f}s recorded) at {speed} against {self.args.url}"
+        )
+        loop = asyncio.get_running_loop()
+        origin = loop.time()
+        await asyncio.gather(*(self.replay_connection(name, reqs, origin) for name, reqs in self.connections.items()))
+        result = self.result
+        result.elapsed = loop.time() - origin
+        result.requests_per_s = result.requests / result.elapsed if result.elapsed else 0.0
+        result.samples_per_s = result.samples / result.elapsed if result.elapsed else 0.0
+        result.latency_ms = percentiles(self.latencies)
+        result.lag_ms = percentiles(self.lags)
+        return result
+
+
+def print_summary(result: ReplayResult):
+    print(f"\n{Colors.CYAN}Replay summary:{Colors.NC}")
+    print(f"  Requests:    {result.requests} ({result.errors} errors) in {result.elapsed:.2f}s")
+    print(f"  Ingested:    {result.batches} batches, {result.samples} samples, {result.actions} actions")
+    print(f"  Throughput:  {result.requests_per_s:,.0f} requests/s, {result.samples_per_s:,.0f} samples/s")
+    print(f"  Latency ms:  {', '.join(f'{k} {v}' for k, v in result.latency_ms.items())}")
+    print(f"  End-to-end lag ms (scheduled -> response): {', '.join(f'{k} {v}' for k, v in result.lag_ms.items())}")
+
+
+def compare(result: ReplayResult, baseline_path: str, max_regression: float) -> bool:
+    """True when sample throughput stays within ``max_regression`` percent of the baseline"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = baseline.get('samples_per_s', 0.0)
+    change = (result.samples_per_s - before) / before * 100 if before else 0.0
+    ok = change >= -max_regression
+    color = Colors.GREEN if ok else Colors.RED
+    print(f"{color}[COMPARE]{Colors.NC} {result.samples_per_s:,.0f} samples/s vs baseline {before:,.0f} ({change:+.1f}%)")
+    for key in ('p50', 'p99'):
+        if key in baseline.get('latency_ms', {}) and key in result.latency_ms:
+            print(f"          latency {key}: {result.latency_ms[key]} ms vs {baseline['latency_ms'][key]} ms")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MaskService Session Replay')
+    parser.add_argument('recording', help='JSONL recording (e.g. from stand_simulator.py --record)')
+    parser.add_argument('--url', default='http://localhost:8203', help='Tests backend URL')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed factor; 0 replays as fast as possible')
+    parser.add_argument('--suffix', default=f"-replay{int(time.time())}", help="Suffix appended to test ids ('' keeps them)")
+    parser.add_argument('--shift-time', action='store_true', help='Move sample timestamps so the replay starts now')
+    parser.add_argument('--save', help='Write the result as JSON (usable as a --baseline later)')
+    parser.add_argument('--baseline', help='Compare ingest throughput with a saved result')
+    parser.add_argument('--max-regression', type=float, default=5.0, help='Allowed throughput drop in percent')
+
+    args = parser.parse_args()
+    if args.speed < 0:
+        parser.error('--speed must not be negative')
+
+    try:
+        result = asyncio.run(SessionReplay(args).run())
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    print_summary(result)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(asdict(result), f, indent=2)
+    if args.baseline and not compare(result, args.baseline, args.max_regression):
+        sys.exit(1)
+    sys.exit(1 if result.errors else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+"""
+MaskService Test-Stand Simulator
+Emulates N multi-channel test stands streaming pressure curves into the tests backend
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, TextIO, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Device types from page/devices/js/0.1.0/devices.js; pressures in mbar
+DEVICE_PROFILES = {
+    'PP_MASK': {'target': 10.0, 'range': (9.0, 11.0), 'noise': 0.02, 'rise': 1.5},
+    'NP_MASK': {'target': 10.0, 'range': (9.0, 11.0), 'noise': 0.02, 'rise': 2.0},
+    'SCBA': {'target': 25.0, 'range': (23.0, 27.0), 'noise': 0.05, 'rise': 3.0},
+    'CPS': {'target': 17.0, 'range': (15.0, 19.0), 'noise': 0.05, 'rise': 8.0},
+}
+
+# Pressure drop during the hold phase in mbar/s
+LEAK_PROFILES = {
+    'none': 0.0,
+    'tight': 0.002,
+    'slow': 0.01,
+    'fast': 0.08,
+    'burst': 0.5,
+}
+
+# Same phase split as the tests backend plans (page/tests/py/0.1.0/plans.py)
+PHASES = (('pressurize', 0.2), ('hold', 0.6), ('release', 0.2))
+
+FAULTS = ('dropout', 'spike', 'stuck', 'disconnect')
+
+
+class Colors:
+    GREEN = '\033[0;32m'
+    RED = '\033[0;31m'
+    YELLOW = '\033[1;33m'
+    BLUE = '\033[0;34m'
+    CYAN = '\033[0;36m'
+    NC = '\033[0m'  # No Color
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams (one request in flight)"""
+
+    def __init__(self, base_url: str, name: str = 'main'):
+        self.name = name
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 80
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+        payload = json.dumps(body, separators=(',', ':')).encode() if body is not None else b''
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Connection: keep-alive\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n"
+        ).encode()
+        for attempt in (0, 1):
+            try:
+                if self.writer is None:
+                    self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+                self.writer.write(head + payload)
+                await self.writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self.reader.readuntil(b'\r\n')) != b'\r\n':
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding') == 'chunked':
+            body = b''
+            while size := int((await self.reader.readuntil(b'\r\n')).strip(), 16):
+                body += (await self.reader.readexactly(size + 2))[:-2]
+            await self.reader.readuntil(b'\r\n')
+        else:
+            body = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, body
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+
+@dataclass
+class Stats:
+    batches: int = 0
+    samples: int = 0
+    errors: int = 0
+    faults: Dict[str, int] = field(default_factory=lambda: {name: 0 for name in FAULTS})
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=100_000))  # most recent requests
+
+    def percentile(self, q: float) -> float:
+        return float(np.percentile(self.latencies, q)) * 1000 if self.latencies else 0.0
+
+
+class Recorder:
+    """Writes every request as a JSON line {"t", "conn", "method", "path", "body"} for later replay
+
+    ``conn`` names the connection the request was sent on; requests of one connection are
+    ordered, requests of different connections are independent.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.origin = time.monotonic()
+
+    def write(self, conn: str, method: str, path: str, body: Optional[dict]):
+        line = {'t': round(time.monotonic() - self.origin, 6), 'conn': conn, 'method': method, 'path': path, 'body': body}
+        self.stream.write(json.dumps(line, separators=(',', ':')) + '\n')
+
+
+class PressureCurve:
+    """Cycle-by-cycle pressure of one device: rise to target, leaky hold, release to ambient"""
+
+    def __init__(self, device_type: str, leak_rate: float, duration: float, cycles: int, rng: np.random.Generator):
+        profile = DEVICE_PROFILES[device_type]
+        self.target = profile['target']
+        self.noise = profile['noise']
+        self.rise = profile['rise']
+        self.leak_rate = leak_rate
+        self.cycle_length = duration / cycles
+        self.hold_start = PHASES[0][1] * self.cycle_length
+        self.release_start = (PHASES[0][1] + PHASES[1][1]) * self.cycle_length
+        self.rng = rng
+
+    def sample(self, elapsed: np.ndarray) -> np.ndarray:
+        into_cycle = elapsed % self.cycle_length
+        rise = self.target * (1 - np.exp(-5 * into_cycle / self.rise))
+        hold = self.target - self.leak_rate * (into_cycle - self.hold_start)
+        end_of_hold = self.target - self.leak_rate * (self.release_start - self.hold_start)
+        release = end_of_hold * np.exp(-5 * (into_cycle - self.release_start) / self.rise)
+        pressure = np.where(into_cycle < self.hold_start, rise,
+                            np.where(into_cycle < self.release_start, hold, release))
+        return pressure + self.rng.normal(0.0, self.noise, elapsed.size)
+
+
+class StandSimulator:
+    """Runs all stands and channels as coroutines on one event loop"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.stats = Stats()
+        self.rng = np.random.default_rng(args.seed)
+        self.recorder = Recorder(open(args.record, 'w')) if args.record else None
+        self.stand_state: Dict[str, dict] = {}
+        self.stop = asyncio.Event()
+
+    def print_status(self, message: str, color: str = Colors.GREEN):
+        print(f"{color}[SIM]{Colors.NC} {message}")
+
+    async def send(self, conn: HttpConnection, method: str, path: str, body: Optional[dict]) -> Tuple[int, bytes]:
+        if self.recorder:
+            self.recorder.write(conn.name, method, path, body)
+        start = time.perf_counter()
+        try:
+            status, payload = await conn.request(method, path, body)
+        except (OSError, asyncio.IncompleteReadError):
+            self.stats.errors += 1
+            return 0, b''
+        self.stats.latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            self.stats.errors += 1
+        return status, payload
+
+    async def start_session(self, conn: HttpConnection, test_id: str, channel: int, device_type: str):
+        low, high = DEVICE_PROFILES[device_type]['range']
+        status, payload = await self.send(conn, 'POST', '/api/plans/compile', {
+            'source': 'wizard',
+            'data': {
+                'step1': {'deviceType': device_type, 'deviceModel': 'SIM'},
+                'step2': {'testType': 'pressure', 'testStandard': None, 'pressureRange': [low, high]},
+                'step3': {'duration': self.args.test_duration, 'cycles': self.args.cycles, 'tolerance': 5, 'alerts': True},
+            },
+        })
+        if status == 200:
+            await self.send(conn, 'POST', '/api/sessions', {
+                'test_id': test_id, 'plan_id': json.loads(payload)['plan_id'], 'channel': channel, 'operator': 'simulator',
+            })
+
+    async def run_channel(self, stand: int, channel: int):
+        args = self.args
+        device_type = args.device or random.Random(args.seed + stand * 97 + channel).choice(list(DEVICE_PROFILES))
+        leak = LEAK_PROFILES[args.leak] if args.leak in LEAK_PROFILES else float(args.leak)
+        rng = np.random.default_rng((args.seed, stand, channel))
+        curve = PressureCurve(device_type, leak, args.test_duration, args.cycles, rng)
+        conn = HttpConnection(args.url, f"s{stand:02d}-c{channel}")
+        state = self.stand_state.setdefault(f"stand-{stand:02d}", {'channels': {}})
+        run = 0
+
+        while not self.stop.is_set():
+            test_id = f"sim-s{stand:02d}-c{channel}-r{run:04d}"
+            state['channels'][str(channel)] = {'test_id': test_id, 'device_type': device_type, 'status': 'ONLINE'}
+            if args.sessions:
+                await self.start_session(conn, test_id, channel, device_type)
+            await self._stream_test(conn, test_id, channel, curve, state['channels'][str(channel)])
+            run += 1
+        await conn.close()
+
+    async def _stream_test(self, conn: HttpConnection, test_id: str, channel: int, curve: PressureCurve, state: dict):
+        args = self.args
+        loop = asyncio.get_running_loop()
+        per_batch = max(1, int(round(args.rate * args.batch)))
+        origin = loop.time()
+        wall_origin = time.time()
+        sent = 0
+        total = int(args.rate * args.test_duration)
+        stuck_value = None
+
+        while sent < total and not self.stop.is_set():
+            deadline = origin + (sent + per_batch) / args.rate
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            count = min(per_batch, total - sent)
+            elapsed = (sent + np.arange(count)) / args.rate
+            pressure = curve.sample(elapsed)
+            sent += count
+
+            fault = self._pick_fault()
+            if fault == 'dropout':
+                continue
+            if fault == 'spike':
+                pressure[self.rng.integers(count)] += curve.target * 3
+            elif fault == 'stuck':
+                stuck_value = float(pressure[0]) if stuck_value is None else stuck_value
+            elif fault == 'disconnect':
+                state['status'] = 'OFFLINE'
+                await asyncio.sleep(args.batch * 20)
+                state['status'] = 'ONLINE'
+                continue
+            if stuck_value is not None:
+                pressure[:] = stuck_value
+                if self.rng.random() < 0.2:
+                    stuck_value = None
+
+            body = {
+                'channel': channel,
+                'pressure': np.round(pressure, 4).tolist(),
+                't0': round(wall_origin + float(elapsed[0]), 6),
+                'sample_rate': args.rate,
+            }
+            status, _ = await self.send(conn, 'POST', f"/api/tests/{test_id}/samples", body)
+            if 200 <= status < 300:
+                self.stats.batches += 1
+                self.stats.samples += count
+            state['last_pressure'] = float(pressure[-1])
+
+    def _pick_fault(self) -> Optional[str]:
+        if self.args.fault_rate <= 0 or self.rng.random() >= self.args.fault_rate:
+            return None
+        fault = FAULTS[self.rng.integers(len(FAULTS))]
+        self.stats.faults[fault] += 1
+        return fault
+
+    async def serve_status(self):
+        """Answer GET /status with stand and channel states, as a real stand controller would"""
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                while True:
+                    request = await reader.readuntil(b'\r\n\r\n')
+                    path = request.split(b' ', 2)[1].decode()
+                    stand = path.rstrip('/').rsplit('/', 1)[-1]
+                    if stand in self.stand_state:
+                        payload, status = self.stand_state[stand], '200 OK'
+                    elif path.rstrip('/') == '/status':
+                        payload, status = self.stand_state, '200 OK'
+                    else:
+                        payload, status = {'error': 'unknown stand'}, '404 Not Found'
+                    body = json.dumps(payload).encode()
+                    writer.write(
+                        f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body
+                    )
+                    await writer.drain()
+            except (asyncio.IncompleteReadError, ConnectionError, IndexError):
+                writer.close()
+
+        server = await asyncio.start_server(handle, '0.0.0.0', self.args.serve)
+        self.print_status(f"Stand status served on http://localhost:{self.args.serve}/status", Colors.BLUE)
+        async with server:
+            await self.stop.wait()
+
+    async def report(self):
+        last = 0
+        while not self.stop.is_set():
+            await asyncio.sleep(self.args.report)
+            rate = (self.stats.samples - last) / self.args.report
+            last = self.stats.samples
+            self.print_status(
+                f"{self.stats.batches} batches, {rate:,.0f} samples/s, errors {self.stats.errors}, "
+                f"p50 {self.stats.percentile(50):.1f} ms, p99 {self.stats.percentile(99):.1f} ms",
+                Colors.CYAN,
+            )
+
+    async def run(self):
+        args = self.args
+        self.print_status(
+            f"Simulating {args.stands} stands x {args.channels} channels at {args.rate:g} Hz "
+            f"against {args.url} for {args.duration:g}s"
+        )
+        tasks = [asyncio.create_task(self.run_channel(s, c)) for s in range(args.stands) for c in range(args.channels)]
+        tasks.append(asyncio.create_task(self.report()))
+        if args.serve:
+            tasks.append(asyncio.create_task(self.serve_status()))
+        await asyncio.sleep(args.duration)
+        self.stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.recorder:
+            self.recorder.stream.close()
+        self.print_summary()
+
+    def print_summary(self):
+        stats = self.stats
+        print(f"\n{Colors.CYAN}Simulation summary:{Colors.NC}")
+        print(f"  Batches sent:   {stats.batches}")
+        print(f"  Samples sent:   {stats.samples} ({stats.samples / self.args.duration:,.0f}/s)")
+        print(f"  Errors:         {stats.errors}")
+        print(f"  Faults:         {', '.join(f'{k}={v}' for k, v in stats.faults.items())}")
+        print(f"  Latency p50/p95/p99: {stats.percentile(50):.1f} / {stats.percentile(95):.1f} / {stats.percentile(99):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MaskService Test-Stand Simulator')
+    parser.add_argument('--url', default='http://localhost:8203', help='Tests backend URL')
+    parser.add_argument('--stands', type=int, default=4, help='Number of simulated stands')
+    parser.add_argument('--channels', type=int, default=2, help='Channels per stand')
+    parser.add_argument('--rate', type=float, default=500, help='Samples per second per channel')
+    parser.add_argument('--batch', type=float, default=0.1, help='Seconds of samples per posted batch')
+    parser.add_argument('--duration', type=float, default=60, help='Simulation length in seconds')
+    parser.add_argument('--test-duration', type=float, default=300, help='Length of each simulated test in seconds')
+    parser.add_argument('--cycles', type=int, default=3, help='Cycles per simulated test')
+    parser.add_argument('--device', choices=list(DEVICE_PROFILES), help='Device type for all channels (default: mixed)')
+    parser.add_argument('--leak', default='slow', help=f"Leak profile ({', '.join(LEAK_PROFILES)}) or mbar/s")
+    parser.add_argument('--fault-rate', type=float, default=0.0, help='Probability of a fault per batch')
+    parser.add_argument('--sessions', action='store_true', help='Compile a plan and start a backend session per test')
+    parser.add_argument('--serve', type=int, default=0, help='Serve stand status on this port')
+    parser.add_argument('--record', help='Write every request to this JSONL file for replay')
+    parser.add_argument('--report', type=float, default=5, help='Seconds between progress lines')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+
+    args = parser.parse_args()
+    if args.leak not in LEAK_PROFILES:
+        try:
+            float(args.leak)
+        except ValueError:
+            parser.error(f"--leak must be one of {', '.join(LEAK_PROFILES)} or a number")
+
+    try:
+        asyncio.run(StandSimulator(args).run())
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()